@@ -0,0 +1,342 @@
+import argparse
+import functools
+import json
+import math
+import os
+import time
+
+import main
+from readCourses import get_catalog
+
+
+class CohortAllocator:
+    """
+    Assigns the sections of one semester to a whole cohort at once, within the seats of every section
+    (the "Capacity" of its course browser entry, see OfferedCourses.getCapacity).
+
+    Every student requests courses, e.g. the courses of the semester planned for them. A request is satisfied
+    when the student holds a section of every type of the course (see CourseCatalog.get_types), none of them
+    clashing with the student's other sections. Planned sections are seated first come, first served
+    (see add_student), then allocate maximizes the satisfied requests by iterative matching:
+
+    - every (course, type) is a bipartite matching of its students to its sections, with the seats as
+      capacities. A student without a seat gets one through an augmenting path over the sections: students
+      already seated move to another section of the same type that fits their timetable until one with a free
+      seat is reached, so nobody loses a seat. The scarcest (course, type) pairs go first.
+    - after a round, courses a student only got some of the types of are released, so the next round can give
+      their seats to other students. Rounds stop when one satisfies no more requests.
+
+    A matching pass costs O(students * sections) per (course, type) plus a breadth-first search over its
+    sections per student without a seat, so tens of thousands of students are allocated in seconds.
+    """
+
+    def __init__(self, catalog, default_capacity=None):
+        """
+        Args:
+            catalog (CourseCatalog): The sections of the semester.
+            default_capacity (int): Seats of the sections without a Capacity, unlimited if omitted.
+        """
+        self.catalog = catalog
+        self.default_capacity = default_capacity
+        # per student, the requested codes and (code, type) -> the section it holds
+        self.requests: list[list[str]] = []
+        self.assigned: list[dict] = []
+        # section id -> seats taken
+        self.loads: dict[int, int] = {}
+        # code -> its types, see CourseCatalog.get_types
+        self.types: dict[str, list[str]] = {}
+
+    def get_types(self, code):
+        if code not in self.types:
+            self.types[code] = self.catalog.get_types(code)
+        return self.types[code]
+
+    def get_capacity(self, section):
+        """
+        Returns the seats of a section, math.inf when they are not limited.
+        """
+        capacity = section.getCapacity()
+        if capacity is None:
+            capacity = self.default_capacity
+        return capacity if capacity is not None else math.inf
+
+    def get_free_seats(self, section):
+        return self.get_capacity(section) - self.loads.get(section.getSectionId(), 0)
+
+    def get_patterns(self, student, skip=None):
+        """
+        Returns the time patterns (see CourseCatalog.get_pattern_bit) of the sections a student holds, except
+        the section of the (code, type) skip.
+        """
+        patterns = 0
+        for block, section in self.assigned[student].items():
+            if block != skip:
+                patterns |= self.catalog.get_pattern_bit(section)
+        return patterns
+
+    def take_seat(self, student, section):
+        self.assigned[student][(section.getCode(), section.getCourseType())] = section
+        self.loads[section.getSectionId()] = self.loads.get(section.getSectionId(), 0) + 1
+
+    def release_seat(self, student, block):
+        section = self.assigned[student].pop(block)
+        self.loads[section.getSectionId()] -= 1
+
+    def add_student(self, codes, preferred_sections=()):
+        """
+        Adds a student requesting the given courses. The preferred sections (e.g. those of the student's
+        planned schedule) are taken right away where they still have a free seat and fit the sections taken.
+
+        Returns:
+            int: The index of the student.
+        """
+        student = len(self.requests)
+        self.requests.append(list(dict.fromkeys(codes)))
+        self.assigned.append({})
+        for section in preferred_sections:
+            block = (section.getCode(), section.getCourseType())
+            if section.getCode() not in self.requests[student] or block in self.assigned[student]:
+                continue
+            if self.get_free_seats(section) > 0 \
+                    and not self.catalog.get_conflicts(section) & self.get_patterns(student):
+                self.take_seat(student, section)
+        return student
+
+    def is_satisfied(self, student, code):
+        types = self.get_types(code)
+        return bool(types) and all((code, course_type) in self.assigned[student] for course_type in types)
+
+    def count_satisfied(self):
+        return sum(1 for student, codes in enumerate(self.requests) for code in codes
+                   if self.is_satisfied(student, code))
+
+    def count_requests(self):
+        return sum(len(codes) for codes in self.requests)
+
+    def get_blocks(self):
+        """
+        Returns the students requesting every (code, type), scarcest first: the most students per seat.
+        """
+        blocks = {}
+        for student, codes in enumerate(self.requests):
+            for code in codes:
+                for course_type in self.get_types(code):
+                    blocks.setdefault((code, course_type), []).append(student)
+
+        def scarcity(block):
+            seats = sum(self.get_capacity(section) for section in self.catalog.get_sections(*block))
+            return len(blocks[block]) / seats if seats else math.inf
+
+        return {block: blocks[block] for block in sorted(blocks, key=scarcity, reverse=True)}
+
+    def match_block(self, block, students):
+        """
+        Seats as many of the students requesting a (code, type) as possible, see the class docstring.
+
+        Returns:
+            int: The students seated.
+        """
+        sections = self.catalog.get_sections(*block)
+        count = len(sections)
+        conflicts = [self.catalog.get_conflicts(section) for section in sections]
+        free = [self.get_free_seats(section) for section in sections]
+        index_of = {section.getSectionId(): index for index, section in enumerate(sections)}
+        # the sections every student fits, and for every pair of sections (index, target) the students
+        # seated in index that fit target
+        fitting = {}
+        movers = [[set() for _ in sections] for _ in sections]
+
+        def enter(student, index):
+            for target in fitting[student]:
+                if target != index:
+                    movers[index][target].add(student)
+            self.assigned[student][block] = sections[index]
+
+        def leave(student, index):
+            for target in fitting[student]:
+                movers[index][target].discard(student)
+
+        waiting = []
+        for student in students:
+            patterns = self.get_patterns(student, block)
+            fitting[student] = [index for index in range(count) if not conflicts[index] & patterns]
+            section = self.assigned[student].get(block)
+            if section is not None:
+                enter(student, index_of[section.getSectionId()])
+            elif fitting[student]:
+                waiting.append(student)
+
+        # sections a failed search went through: no free seat can be reached from them for the rest of the pass
+        dead = set()
+        seated = 0
+        for student in waiting:
+            parent = {}
+            queue = [index for index in fitting[student] if index not in dead]
+            for index in queue:
+                parent[index] = None
+            found = None
+            head = 0
+            while head < len(queue):
+                index = queue[head]
+                head += 1
+                if free[index] > 0:
+                    found = index
+                    break
+                for target in range(count):
+                    if target not in parent and target not in dead and movers[index][target]:
+                        parent[target] = index
+                        queue.append(target)
+            if found is None:
+                dead.update(queue)
+                continue
+            # move one student along every step of the path, back from the section with the free seat
+            target = found
+            while parent[target] is not None:
+                index = parent[target]
+                mover = next(iter(movers[index][target]))
+                leave(mover, index)
+                enter(mover, target)
+                target = index
+            enter(student, target)
+            free[found] -= 1
+            self.loads[sections[found].getSectionId()] = self.loads.get(sections[found].getSectionId(), 0) + 1
+            seated += 1
+        return seated
+
+    def release_partial(self):
+        """
+        Releases the sections of every course a student holds only some of the types of.
+        """
+        for student, codes in enumerate(self.requests):
+            for code in codes:
+                if not self.is_satisfied(student, code):
+                    for course_type in self.get_types(code):
+                        if (code, course_type) in self.assigned[student]:
+                            self.release_seat(student, (code, course_type))
+
+    def allocate(self, max_rounds=10):
+        """
+        Runs rounds of matching until one satisfies no more requests.
+
+        Returns:
+            int: The satisfied requests.
+        """
+        blocks = self.get_blocks()
+        self.release_partial()
+        satisfied = self.count_satisfied()
+        for _ in range(max_rounds):
+            for block, students in blocks.items():
+                self.match_block(block, students)
+            self.release_partial()
+            new_satisfied = self.count_satisfied()
+            if new_satisfied <= satisfied:
+                break
+            satisfied = new_satisfied
+        return satisfied
+
+    def get_sections(self, student):
+        """
+        Returns the sections of the satisfied requests of a student, in request order.
+        """
+        return [self.assigned[student][(code, course_type)] for code in self.requests[student]
+                if self.is_satisfied(student, code) for course_type in self.get_types(code)]
+
+    def get_unsatisfied(self, student):
+        return [code for code in self.requests[student] if not self.is_satisfied(student, code)]
+
+    def get_full_sections(self):
+        return [section.getKey() for section in self.catalog
+                if self.loads.get(section.getSectionId(), 0) >= self.get_capacity(section)]
+
+
+def plan_first_semester(entry, user_preferences: dict, engine="greedy", engine_options=None):
+    """
+    Plans the next semester of a batch entry (see main.read_manifest).
+
+    Returns:
+        tuple: (records file, year, semester, section ids, codes) of the planned semester.
+    """
+    records_file, preferences_file = entry
+    if preferences_file is not None:
+        user_preferences = main.read_user_preferences(preferences_file)
+    schedule = main.plan_student(records_file, user_preferences, 1, engine=engine, engine_options=engine_options)[0]
+    codes = list(dict.fromkeys(course.get_code() for course in schedule.get_courses()))
+    return records_file, schedule.get_year(), schedule.get_semester(), schedule.get_section_ids(), codes
+
+
+def allocate_cohort(plans: list, default_capacity=None, max_rounds=10):
+    """
+    Allocates the seats of the semester every student was planned for, one CohortAllocator per semester.
+
+    Args:
+        plans (list): The results of plan_first_semester.
+
+    Returns:
+        dict: semester -> (allocator, list of (records file, year, student index)).
+    """
+    allocations = {}
+    for records_file, year, semester, section_ids, codes in plans:
+        if semester not in allocations:
+            allocations[semester] = (CohortAllocator(get_catalog(semester), default_capacity), [])
+        allocator, students = allocations[semester]
+        catalog = allocator.catalog
+        student = allocator.add_student(codes, [catalog.get_section(section_id) for section_id in section_ids])
+        students.append((records_file, year, student))
+    for allocator, students in allocations.values():
+        allocator.allocate(max_rounds)
+    return allocations
+
+
+def main_allocation(argv=None):
+    parser = argparse.ArgumentParser(description="Plans the next semester of a batch of students and allocates "
+                                                 "the section seats to the whole cohort.")
+    parser.add_argument("--batch", required=True, help="a directory of student records files, or a manifest")
+    parser.add_argument("--preferences", required=True)
+    parser.add_argument("--default-capacity", type=int,
+                        help="seats of the sections without a Capacity in the course browser (default: unlimited)")
+    parser.add_argument("--rounds", type=int, default=10, help="most matching rounds (default: 10)")
+    parser.add_argument("--engine", choices=sorted(main.SCHEDULER_ENGINES), default="greedy")
+    parser.add_argument("--time-budget", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output-dir", help="write the allocated schedule of every student here")
+    parser.add_argument("--format", choices=sorted(main.OUTPUT_FORMATS), default="text")
+    parser.add_argument("--report", help="save the sections and unsatisfied courses of every student to this JSON file")
+    args = parser.parse_args(argv)
+
+    data = main.load_planner_data()
+    user_preferences = main.read_user_preferences(args.preferences)
+    engine_options = main.get_engine_options(args.engine, args.time_budget)
+    function = functools.partial(plan_first_semester, user_preferences=user_preferences, engine=args.engine,
+                                 engine_options=engine_options)
+    start = time.perf_counter()
+    plans = main.map_students(function, main.read_manifest(args.batch), args.workers, data)
+    planned = time.perf_counter()
+    allocations = allocate_cohort(plans, args.default_capacity, args.rounds)
+    allocated = time.perf_counter()
+    print(f"Planned {len(plans)} students in {planned - start:.2f} s, allocated the seats in "
+          f"{allocated - planned:.2f} s")
+    report = {}
+    names = main.get_output_names(plan[0] for plan in plans)
+    for semester, (allocator, students) in sorted(allocations.items()):
+        requests = allocator.count_requests()
+        satisfied = allocator.count_satisfied()
+        print(f"Semester {semester}: {len(students)} students, {satisfied} of {requests} requested courses "
+              f"seated, {len(allocator.get_full_sections())} sections full")
+        for records_file, year, student in students:
+            sections = allocator.get_sections(student)
+            report[records_file] = {"year": year,
+                                    "semester": semester,
+                                    "sections": [section.getKey() for section in sections],
+                                    "unsatisfied": allocator.get_unsatisfied(student)}
+            if args.output_dir is not None:
+                os.makedirs(args.output_dir, exist_ok=True)
+                main.save_schedules([main.Schedule(year, semester, sections)],
+                                    main.get_output_path(records_file, args.output_dir, args.format,
+                                                         names[records_file]), args.format)
+    if args.report is not None:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main_allocation()
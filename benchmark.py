@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+import main
+import readCourses
+from readCourses import COURSE_BROWSER_FILES, build_offering_index
+
+# engine and engine options compared by the graduation benchmark
+GRADUATION_CONFIGURATIONS = [
+    ("greedy, plan order", "greedy", {"order": "plan"}),
+    ("greedy, critical path", "greedy", {"order": "priority"}),
+    ("exact, critical path", "exact", {"time_budget": 0.5}),
+    ("greedy, lookahead x1", "greedy", {"beam_width": 1}),
+    ("greedy, lookahead x4", "greedy", {"beam_width": 4}),
+]
+
+
+def get_reachable_courses(data):
+    """
+    Returns the study plan courses the planner can ever place, see main.get_reachable_courses.
+    """
+    graph = data["prerequisite_graph"]
+    return main.get_reachable_courses(data["study_plan"], graph, build_offering_index(graph.courses))
+
+
+def write_sample_records(directory):
+    """
+    Writes the sample students of the benchmark: a new student, and every prefix (semester by semester)
+    of temp.txt, the longest sample record of the repository. StudentRecords.txt is a prefix of it.
+
+    Returns:
+        list: The records files, in order.
+    """
+    files = []
+    new_student = os.path.join(directory, "new_student.txt")
+    with open(new_student, "w") as file:
+        file.write("")
+    files.append(new_student)
+    with open("temp.txt", "r") as file:
+        lines = file.read().strip().split("\n")
+    for count in range(1, len(lines)):
+        records_file = os.path.join(directory, f"after_{count}_semesters.txt")
+        with open(records_file, "w") as file:
+            file.write("\n".join(lines[:count + 1]))
+        files.append(records_file)
+    return files
+
+
+def get_semesters_to_graduation(records_file, user_preferences, engine, engine_options, data, horizon):
+    """
+    Plans up to horizon semesters and returns how many it takes to pass every reachable course, or None.
+    """
+    reachable = get_reachable_courses(data)
+    passed_courses = main.get_passed_courses(main.read_student_records(records_file))
+    state = main.StudentState(passed_courses)
+    if reachable <= state.passed:
+        return 0
+    current_year, current_semester = main.get_current_semester(passed_courses, records_file)
+    schedules = main.create_schedules(data["study_plan"], passed_courses, user_preferences, data["electives"],
+                                      horizon, current_semester, current_year, data["priority_pres"], verbose=False,
+                                      engine=engine, engine_options=engine_options,
+                                      prerequisite_graph=data["prerequisite_graph"],
+                                      elective_index=data["elective_index"])
+    for index, schedule in enumerate(schedules):
+        state.update(course.get_code() for course in schedule.get_courses())
+        if reachable <= state.passed:
+            return index + 1
+    return None
+
+
+def run_graduation(user_preferences, horizon=20):
+    """
+    Prints the semesters to graduation of every sample student under every configuration.
+    """
+    data = main.load_planner_data()
+    with tempfile.TemporaryDirectory() as directory:
+        records_files = write_sample_records(directory)
+        names = [name for name, engine, options in GRADUATION_CONFIGURATIONS]
+        print("%-28s" % "student" + "".join("%-24s" % name for name in names))
+        totals = {name: 0 for name in names}
+        for records_file in records_files:
+            row = "%-28s" % os.path.splitext(os.path.basename(records_file))[0]
+            for name, engine, options in GRADUATION_CONFIGURATIONS:
+                start = time.perf_counter()
+                semesters = get_semesters_to_graduation(records_file, user_preferences, engine, options, data,
+                                                        horizon)
+                elapsed = time.perf_counter() - start
+                totals[name] += semesters if semesters is not None else horizon
+                result = str(semesters) if semesters is not None else f">{horizon}"
+                row += "%-24s" % f"{result} ({elapsed * 1000:.0f} ms)"
+            print(row)
+        print("%-28s" % "total" + "".join("%-24s" % totals[name] for name in names))
+
+
+def write_synthetic_catalog(file_path, directory, scale):
+    """
+    Writes a course browser file scale times as large as file_path: every section is repeated with new
+    section numbers, alternately under its own code (more sections per planned course) and under a new code
+    (a larger index).
+
+    Returns:
+        str: The path of the synthetic file.
+    """
+    courses = readCourses.load_course_browser(file_path)
+    synthetic = {}
+    for key, value in courses.items():
+        code, course_type, section = key.split('-')
+        synthetic[key] = value
+        for copy in range(1, scale):
+            copy_code = code if copy % 2 else f"{code}S{copy}"
+            synthetic[f"{copy_code}-{course_type}-{int(section) + 100 * copy}"] = value
+    synthetic_path = os.path.join(directory, f"x{scale}_{os.path.basename(file_path)}")
+    with open(synthetic_path, "w") as file:
+        json.dump(synthetic, file)
+    return synthetic_path
+
+
+def write_synthetic_students(directory, count, seed=0):
+    """
+    Writes count student records files, each a random semester prefix of temp.txt with some grades
+    turned into fails, so students are at different points of the study plan.
+
+    Returns:
+        list: The records files.
+    """
+    rng = random.Random(seed)
+    with open("temp.txt", "r") as file:
+        lines = file.read().strip().split("\n")
+    files = []
+    for index in range(count):
+        records = [lines[0]]
+        for line in lines[1:rng.randint(1, len(lines) - 1) + 1]:
+            element = line.split(",")
+            courses = []
+            for course in element[2:]:
+                code, grade = course.split(":")
+                if rng.random() < 0.1:
+                    grade = str(rng.randint(40, 59))
+                courses.append(f"{code}:{grade}")
+            records.append(",".join(element[:2] + courses))
+        records_file = os.path.join(directory, f"student_{index}.txt")
+        with open(records_file, "w") as file:
+            file.write("\n".join(records))
+        files.append(records_file)
+    return files
+
+
+def measure(function, memory=True):
+    """
+    Runs function once for its wall time, and once more under tracemalloc for its peak memory.
+
+    Returns:
+        A tuple (result, {"seconds": ..., "peak_bytes": ...}).
+    """
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    stage = {"seconds": seconds}
+    if memory:
+        tracemalloc.start()
+        function()
+        stage["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, stage
+
+
+def run_stages(scale, students, user_preferences, num_of_semesters=3, engine="greedy", memory=True):
+    """
+    Times every stage of the planner on catalogs and a student population scale times the real size.
+
+    Returns:
+        dict: The result of the run, with one entry per stage.
+    """
+    stages = {}
+    with tempfile.TemporaryDirectory() as directory:
+        files = {}
+        for semester, file_path in COURSE_BROWSER_FILES.items():
+            files[semester] = file_path if scale == 1 else write_synthetic_catalog(file_path, directory, scale)
+
+        def load_cold():
+            return {semester: readCourses.load_catalog(path, use_cache=False) for semester, path in files.items()}
+
+        catalogs, stages["load_cold"] = measure(load_cold, memory)
+        for semester, path in files.items():
+            readCourses.write_catalog_cache(path, catalogs[semester])
+        catalogs, stages["load_warm"] = measure(
+            lambda: {semester: readCourses.load_catalog(path) for semester, path in files.items()}, memory)
+        saved_catalogs = dict(readCourses.loaded_catalogs)
+        readCourses.loaded_catalogs.update(catalogs)
+
+        def read_study_plan():
+            main.store_plan.clear()
+            return main.readStudyPlan("CEStudyPlan.txt")
+
+        study_plan, stages["read_study_plan"] = measure(read_study_plan, memory)
+        main.planner_data.clear()
+        data = main.load_planner_data()
+
+        records_files = write_synthetic_students(directory, students)
+        all_records, stages["read_student_records"] = measure(
+            lambda: [main.read_student_records(records_file) for records_file in records_files], memory)
+
+        def plan_all():
+            results = []
+            for records_file, student_records in zip(records_files, all_records):
+                passed_courses = main.get_passed_courses(student_records)
+                current_year, current_semester = main.get_current_semester(passed_courses, records_file)
+                results.append(main.create_schedules(data["study_plan"], passed_courses, user_preferences,
+                                                     data["electives"], num_of_semesters, current_semester,
+                                                     current_year, data["priority_pres"], verbose=False,
+                                                     engine=engine, prerequisite_graph=data["prerequisite_graph"],
+                                                     elective_index=data["elective_index"]))
+            return results
+
+        results, stages["create_schedules"] = measure(plan_all, memory)
+        output_file = os.path.join(directory, "SuggestedCourses.txt")
+
+        def render_all():
+            for schedules in results:
+                main.save_schedules(schedules, output_file)
+
+        _, stages["print_schedules"] = measure(render_all, memory)
+        readCourses.loaded_catalogs.clear()
+        readCourses.loaded_catalogs.update(saved_catalogs)
+
+    planning = stages["create_schedules"]["seconds"]
+    return {"scale": scale,
+            "sections": sum(len(catalog) for catalog in catalogs.values()),
+            "students": students,
+            "semesters": num_of_semesters,
+            "engine": engine,
+            "stages": stages,
+            "students_per_second": students / planning if planning > 0 else None}
+
+
+def print_stages(run, previous=None):
+    """
+    Prints one run of run_stages, next to the matching run of an earlier result file when given.
+    """
+    print(f"scale x{run['scale']}: {run['sections']} sections, {run['students']} students, "
+          f"{run['students_per_second']:.1f} students/s")
+    for name, stage in run["stages"].items():
+        line = "  %-22s%10.1f ms" % (name, stage["seconds"] * 1000)
+        if "peak_bytes" in stage:
+            line += "%12.1f MB peak" % (stage["peak_bytes"] / 2 ** 20)
+        if previous is not None and name in previous["stages"] and previous["stages"][name]["seconds"] > 0:
+            line += "   %+.0f%% time vs previous" % (
+                (stage["seconds"] / previous["stages"][name]["seconds"] - 1) * 100)
+        print(line)
+
+
+def run_stage_suite(scales, students, user_preferences, num_of_semesters, engine, memory, output, compare):
+    previous_runs = {}
+    if compare is not None:
+        with open(compare, "r") as file:
+            previous_runs = {run["scale"]: run for run in json.load(file)["runs"]}
+    runs = []
+    for scale in scales:
+        run = run_stages(scale, students * scale, user_preferences, num_of_semesters, engine, memory)
+        print_stages(run, previous_runs.get(scale))
+        runs.append(run)
+    if output is not None:
+        with open(output, "w") as file:
+            json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "runs": runs}, file, indent=2)
+        print(f"Results saved to {output}")
+
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the study schedule planner.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    graduation = subparsers.add_parser("graduation", help="semesters to graduation of the sample records")
+    graduation.add_argument("--preferences", default="Preferences.json")
+    graduation.add_argument("--horizon", type=int, default=20, help="most semesters planned per student")
+    stages = subparsers.add_parser("stages", help="time and peak memory of every planner stage")
+    stages.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100],
+                        help="catalog and population sizes, as multiples of the real ones (default: 1 10 100)")
+    stages.add_argument("--students", type=int, default=10, help="students at scale 1 (default: 10)")
+    stages.add_argument("--semesters", type=int, default=3)
+    stages.add_argument("--engine", choices=sorted(main.SCHEDULER_ENGINES), default="greedy")
+    stages.add_argument("--preferences", default="Preferences.json")
+    stages.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass of every stage")
+    stages.add_argument("--output", help="save the results to this JSON file")
+    stages.add_argument("--compare", help="a JSON file of an earlier run to compare the times with")
+    args = parser.parse_args(argv)
+
+    if args.command == "graduation":
+        run_graduation(main.read_user_preferences(args.preferences), args.horizon)
+    elif args.command == "stages":
+        run_stage_suite(args.scale, args.students, main.read_user_preferences(args.preferences), args.semesters,
+                        args.engine, not args.no_memory, args.output, args.compare)
+
+
+if __name__ == "__main__":
+    main_benchmark()
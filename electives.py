@@ -0,0 +1,222 @@
+import json
+
+# the placeholders and quotas of the electives file, see read_elective_rules. It is not shipped until the official
+# rules are known (ElectiveRules.example.json shows the layout), so by default there are none
+ELECTIVE_RULES_FILE = "ElectiveRules.json"
+# placeholders other than those of "placeholders" end in WILDCARD characters, and are filled by the electives
+# whose code starts the same (ENCS53xx: ENCS5321, ...)
+WILDCARD = "x"
+
+
+def read_elective_rules(file_path=ELECTIVE_RULES_FILE):
+    """
+        Reads the elective rules of the study plan, a JSON file such as
+        {"placeholders": {"UE": ["0"]}, "quotas": {"1": 2, "2": 2}}:
+
+        - placeholders: study plan placeholder -> the groups of the electives file (one or a list) whose electives
+          fill it.
+        - quotas: group -> the most electives of the group one student takes, groups not listed are not limited.
+
+        Returns:
+            tuple: (placeholders, quotas), with every group as a string. Both are empty if the file does not exist.
+
+        Raises:
+            ValueError: If the file is not laid out as above.
+    """
+    try:
+        with open(file_path, "r") as file:
+            rules = json.load(file)
+    except FileNotFoundError:
+        return {}, {}
+    if not isinstance(rules, dict):
+        raise ValueError(f"{file_path} must hold a JSON object")
+    placeholders = {}
+    for placeholder, groups in rules.get("placeholders", {}).items():
+        groups = [groups] if isinstance(groups, (str, int)) else groups
+        if not isinstance(groups, list):
+            raise ValueError(f"{file_path}: the groups of {placeholder} must be a group or a list of groups")
+        placeholders[placeholder] = [str(group) for group in groups]
+    quotas = {}
+    for group, quota in rules.get("quotas", {}).items():
+        if not isinstance(quota, int) or quota < 0:
+            raise ValueError(f"{file_path}: the quota of group {group} must be a non-negative integer")
+        quotas[str(group)] = quota
+    return placeholders, quotas
+
+
+class ElectiveIndex:
+    """
+        The electives of the electives file indexed by group and by placeholder, to fill the elective slots
+        of the study plan (ENCS53xx, ENCS51xx, UE) with real courses.
+
+        Every code is indexed under each of its prefixes, so the candidates of a wildcard placeholder are one
+        dictionary lookup, compiled once per placeholder (see get_candidates). Placeholders without a wildcard
+        (UE) are filled from the groups read_elective_rules maps them to, and group quotas limit how many
+        electives of a group one student takes.
+    """
+
+    def __init__(self, groups: dict, quotas: dict = None, placeholders: dict = None):
+        """
+            Args:
+                groups (dict): {group: {code: prerequisites}}, as returned by read_elective_groups.
+                quotas (dict): group -> the most electives of the group per student, none if omitted.
+                placeholders (dict): placeholder -> the groups filling it, only wildcards if omitted.
+        """
+        self.prerequisites: dict[str, list] = {}
+        self.group_of: dict[str, str] = {}
+        self.by_group: dict[str, list[str]] = {}
+        # (prefix, code length) -> codes, for every prefix of every code
+        self.by_prefix: dict[tuple[str, int], list[str]] = {}
+        for group, courses in groups.items():
+            for code, pre in courses.items():
+                if code in self.group_of:
+                    continue
+                self.prerequisites[code] = [item for item in pre if item]
+                self.group_of[code] = group
+                self.by_group.setdefault(group, []).append(code)
+                for length in range(len(code) + 1):
+                    self.by_prefix.setdefault((code[:length], len(code)), []).append(code)
+        self.quotas = quotas or {}
+        self.placeholders = placeholders or {}
+        # placeholder -> its candidates, see get_candidates
+        self.candidates: dict[str, tuple] = {}
+        # id of a study plan -> (the study plan, its placeholder slots), see get_slots
+        self.slots: dict[int, tuple] = {}
+
+    @classmethod
+    def from_electives(cls, electives: dict):
+        """
+            Builds the index of electives read without their groups (see read_electives), all in one group.
+        """
+        return cls({None: electives or {}})
+
+    @classmethod
+    def from_files(cls, groups: dict, rules_file=ELECTIVE_RULES_FILE):
+        """
+            Builds the index of the electives of read_elective_groups with the rules of read_elective_rules.
+        """
+        placeholders, quotas = read_elective_rules(rules_file)
+        return cls(groups, quotas, placeholders)
+
+    def is_placeholder(self, code):
+        return code in self.placeholders or code.endswith(WILDCARD)
+
+    def get_candidates(self, placeholder):
+        """
+            Returns the electives that can fill a placeholder of the study plan, in electives file order.
+        """
+        if placeholder not in self.candidates:
+            if placeholder in self.placeholders:
+                candidates = [code for group in self.placeholders[placeholder] for code in self.by_group.get(group, [])]
+            elif placeholder.endswith(WILDCARD):
+                prefix = placeholder.rstrip(WILDCARD)
+                candidates = self.by_prefix.get((prefix, len(placeholder)), [])
+            else:
+                candidates = []
+            self.candidates[placeholder] = tuple(candidates)
+        return self.candidates[placeholder]
+
+    def get_group(self, code):
+        return self.group_of.get(code)
+
+    def get_prerequisites(self, code):
+        return self.prerequisites.get(code, [])
+
+    def get_slots(self, study_plan: dict):
+        """
+            Returns the (year, semester, index) of every placeholder of a study plan, found once per study plan.
+        """
+        cached = self.slots.get(id(study_plan))
+        if cached is None or cached[0] is not study_plan:
+            slots = [(year, semester, index) for year in study_plan.keys()
+                     for semester, values in study_plan[year].items()
+                     for index, value in enumerate(values) if self.is_placeholder(value['course'])]
+            cached = self.slots[id(study_plan)] = (study_plan, slots)
+        return cached[1]
+
+    def report(self):
+        """
+            Returns a list of human readable problems of the rules: groups the electives file does not have.
+        """
+        messages = []
+        for placeholder, groups in self.placeholders.items():
+            for group in groups:
+                if group not in self.by_group:
+                    messages.append(f"Placeholder {placeholder} is filled from group {group}, which has no electives")
+        for group in self.quotas:
+            if group not in self.by_group:
+                messages.append(f"Quota of group {group}, which has no electives")
+        return messages
+
+    def has_quota(self, group, taken):
+        quota = self.quotas.get(group)
+        return quota is None or taken < quota
+
+    def resolve_study_plan(self, study_plan: dict, passed, is_available, priorities: dict = None):
+        """
+            Fills the placeholder slots of a study plan for one student and one semester.
+
+            A slot is first filled by a passed elective it accepts (each elective fills one slot). The other
+            slots, in study plan order, get the available elective (e.g. offered this semester, prerequisites
+            passed) with the highest priority among those not passed, not given to another slot and within
+            the quota of its group. A slot without such an elective stays a placeholder.
+
+            Args:
+                study_plan (dict): The study plan, as returned by readStudyPlan.
+                passed: The codes of the passed (or already planned) courses.
+                is_available: A function telling if an elective code can be taken now.
+                priorities (dict): Priority of each code, e.g. PrerequisiteGraph.get_priorities().
+
+            Returns:
+                dict: A study plan with the same years and semesters, placeholders replaced by electives.
+                The study plan itself is returned when it has no placeholder.
+        """
+        slots = self.get_slots(study_plan)
+        if not slots:
+            return study_plan
+        # only the semesters with a placeholder are copied
+        resolved = {year: dict(semesters) for year, semesters in study_plan.items()}
+        for year, semester, index in slots:
+            if resolved[year][semester] is study_plan[year][semester]:
+                resolved[year][semester] = list(study_plan[year][semester])
+        # elective -> is_available(elective), asked once per elective
+        available = {}
+        assigned = set()
+        taken_per_group = {}
+        for code in passed:
+            if code in self.group_of:
+                group = self.group_of[code]
+                taken_per_group[group] = taken_per_group.get(group, 0) + 1
+        open_slots = []
+        for year, semester, index in slots:
+            placeholder = resolved[year][semester][index]['course']
+            code = next((code for code in self.get_candidates(placeholder) if code in passed and code not in assigned),
+                        None)
+            if code is None:
+                open_slots.append((year, semester, index))
+            else:
+                assigned.add(code)
+                resolved[year][semester][index] = {'course': code, 'prerequisites': self.prerequisites[code]}
+        for year, semester, index in open_slots:
+            placeholder = resolved[year][semester][index]['course']
+            choices = []
+            for code in self.get_candidates(placeholder):
+                if code in passed or code in assigned \
+                        or not self.has_quota(self.group_of[code], taken_per_group.get(self.group_of[code], 0)):
+                    continue
+                if code not in available:
+                    available[code] = is_available(code)
+                if available[code]:
+                    choices.append(code)
+            if not choices:
+                continue
+            if priorities is not None:
+                # highest priority first, electives file order among equals
+                code = max(choices, key=lambda choice: priorities.get(choice, 0))
+            else:
+                code = choices[0]
+            assigned.add(code)
+            group = self.group_of[code]
+            taken_per_group[group] = taken_per_group.get(group, 0) + 1
+            resolved[year][semester][index] = {'course': code, 'prerequisites': self.prerequisites[code]}
+        return resolved
@@ -1,19 +1,36 @@
-import datetime
+import argparse
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import heapq
+import itertools
+import json
 import os.path
+import pickle
 import random
-from readCourses import offered_list1, offered_list2, offered_list3
+import time
+from electives import ELECTIVE_RULES_FILE, ElectiveIndex
+from prerequisites import PrerequisiteGraph
+from schedule_writer import OUTPUT_FORMATS, format_text, get_week_schedule, write_atomic, write_schedules
+from readCourses import COURSE_BROWSER_FILES, DAY_INDEX, DAYS, MINUTES_PER_DAY, WEEK_DAYS, OfferingIndex, \
+    build_offering_index, get_catalog, get_max_busy_days, get_next_semester, get_source_signature, load_all_catalogs, \
+    parse_time_range, schedule_to_mask
 
 
 # from part2 import get_course_schedule
 
 
 class Course:
+    __slots__ = ('code', 'section', 'instructor', 'schedule', 'course_type', 'mask')
+
     def __init__(self, code, section, course_type, instructor, schedule):
         self.code = code
         self.section = section
         self.instructor = instructor
         self.schedule = schedule
         self.course_type = course_type
+        self.mask = schedule_to_mask(schedule)
 
     def get_code(self):
         return self.code
@@ -29,12 +46,18 @@ class Course:
 
     def setScheduling(self, new_schedule):
         self.schedule = new_schedule
+        self.mask = schedule_to_mask(new_schedule)
 
     def __str__(self):
         return f"{self.code}-{self.course_type}-{self.section}-{self.instructor}-{self.schedule}"
 
 
 class Schedule:
+    """
+    The courses of one semester. The planner stores the catalog's OfferedCourses sections themselves (they
+    provide the Course interface), so a schedule only holds references to shared sections.
+    """
+
     def __init__(self, year, semester, courses: list[Course]):
         self.year = year
         self.semester = semester
@@ -49,6 +72,34 @@ class Schedule:
     def get_courses(self):
         return self.courses
 
+    def to_dict(self):
+        """
+        Returns the schedule as plain data (e.g. for JSON): year, semester, and the code, type, section,
+        instructor and class times of every course.
+        """
+        return {"year": self.year,
+                "semester": self.semester,
+                "courses": [{"code": course.get_code(),
+                             "type": getattr(course, "course_type", None),
+                             "section": course.get_section(),
+                             "instructor": course.get_instructor(),
+                             "schedule": dict(course.getScheduling())} for course in self.courses]}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Rebuilds a schedule saved with to_dict. Its courses are Course objects, not catalog sections.
+        """
+        return cls(data["year"], data["semester"],
+                   [Course(course["code"], course["section"], course["type"], course["instructor"], course["schedule"])
+                    for course in data["courses"]])
+
+    def get_section_ids(self):
+        """
+        Returns the catalog ids of the sections in the schedule (None for courses not taken from a catalog).
+        """
+        return [getattr(course, "section_id", None) for course in self.courses]
+
     def __str__(self):
         string = f"Year: {self.year}\tSemester: {self.semester}\n"
         for course in self.courses:
@@ -71,6 +122,50 @@ class Plan:
         return self.code
 
 
+class StudentState:
+    """
+    The courses a student has passed (or has planned so far), with O(1) membership tests and a running
+    total of the passed credit hours. Built once from the passed courses and updated as semesters are planned.
+    """
+
+    def __init__(self, passed_courses: dict = None):
+        self.passed: set[str] = set()
+        self.passed_hours = 0
+        if passed_courses is not None:
+            for year in passed_courses.keys():
+                for semester, codes in passed_courses[year].items():
+                    for code in codes:
+                        self.add(code)
+
+    @classmethod
+    def from_records(cls, student_records: dict):
+        return cls(get_passed_courses(student_records))
+
+    def add(self, code):
+        if code not in self.passed:
+            self.passed.add(code)
+            self.passed_hours += get_hours(code)
+
+    def update(self, codes):
+        for code in codes:
+            self.add(code)
+
+    def copy(self):
+        state = StudentState()
+        state.passed = set(self.passed)
+        state.passed_hours = self.passed_hours
+        return state
+
+    def __contains__(self, code):
+        return code in self.passed
+
+    def __len__(self):
+        return len(self.passed)
+
+    def __iter__(self):
+        return iter(self.passed)
+
+
 store_plan: list[Plan] = []
 
 
@@ -135,28 +230,36 @@ def read_student_records(file):
         }
         """
     try:
-        records = {}
         with open(file, "r") as f:
-            lines = f.readlines()[1:]
-            for line in lines:
-                element = line.strip().split(",")
-                year = int(element[0])
-                semester = int(element[1])
-                # check if year exists in the records dictionary
-                if not year in records:
-                    records[year] = {}
-                # check if semester exists in the records dictionary
-                if not semester in records[year]:
-                    records[year][semester] = {}
-
-                for course in element[2:]:
-                    course_code, grade = course.split(":")
-                    records[year][semester][course_code] = int(grade)
-        return records
+            return parse_student_records(f.readlines()[1:])
     except FileNotFoundError:
         print("File Not Found!")
 
 
+def parse_student_records(lines):
+    """
+        Parses the lines of a student records file that follow its header line, see read_student_records.
+    """
+    records = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        element = line.strip().split(",")
+        year = int(element[0])
+        semester = int(element[1])
+        # check if year exists in the records dictionary
+        if not year in records:
+            records[year] = {}
+        # check if semester exists in the records dictionary
+        if not semester in records[year]:
+            records[year][semester] = {}
+
+        for course in element[2:]:
+            course_code, grade = course.split(":")
+            records[year][semester][course_code] = int(grade)
+    return records
+
+
 def get_passed_courses(student_records):
     """
         Returns a dictionary of passed courses from the input student records.
@@ -237,6 +340,7 @@ def display_with_passed(study_plan, passed_courses):
     head_y = "Year"
     head_s = "Semester"
     head_c = "Courses"
+    passed = StudentState(passed_courses)
     print("%-5s%-10s%-5s\n" % (head_y, head_s, head_c))
     for year in study_plan:
         for semester, values_list in study_plan[year].items():
@@ -244,13 +348,7 @@ def display_with_passed(study_plan, passed_courses):
             for value in values_list:
                 course_code = value['course']
                 # check if course is present in the passed_courses dictionary
-                flag = 0
-                for key in passed_courses.keys():
-                    for sem, passed_list in passed_courses[key].items():
-                        if course_code in passed_list:
-                            flag = 1
-                            break
-                if flag:
+                if course_code in passed:
                     courses.append("\033[32m" + course_code + "\033[0m")
                 else:
                     courses.append(course_code)
@@ -265,7 +363,7 @@ def display_with_current(study_plan, passed_courses, current_passed):
     Args:
         study_plan (dict): A dictionary containing the student's study plan.
         passed_courses (dict): A dictionary containing the courses that the student has passed.
-        current_passed (list): A list containing the course codes of the courses that the student is currently taking.
+        current_passed (list): A list (or set, StudentState) containing the course codes of the courses that the student is currently taking.
 
     Returns:
         None
@@ -273,6 +371,9 @@ def display_with_current(study_plan, passed_courses, current_passed):
     head_y = "Year"
     head_s = "Semester"
     head_c = "Courses"
+    passed = StudentState(passed_courses)
+    if not isinstance(current_passed, (set, frozenset, StudentState)):
+        current_passed = set(current_passed)
     print("%-5s%-10s%-5s\n" % (head_y, head_s, head_c))
     for year in study_plan:
         for semester, values_list in study_plan[year].items():
@@ -280,18 +381,9 @@ def display_with_current(study_plan, passed_courses, current_passed):
             for value in values_list:
                 course_code = value['course']
                 # check if course is present in the passed_courses dictionary
-                passed_flag = 0
-                current_flag = 0
-                for key in passed_courses.keys():
-                    for sem, passed_list in passed_courses[key].items():
-                        if course_code in passed_list:
-                            passed_flag = 1
-                            break
-                if course_code in current_passed:
-                    current_flag = 1
-                if passed_flag:
+                if course_code in passed:
                     courses.append("\033[32m" + course_code + "\033[0m")
-                elif current_flag:
+                elif course_code in current_passed:
                     courses.append("\033[31m" + course_code + "\033[0m")
                 else:
                     courses.append(course_code)
@@ -325,6 +417,37 @@ def read_electives(filename):
         print("File Not Found")
 
 
+def read_elective_groups(filename):
+    """
+    Reads the electives file like read_electives, keeping the group column.
+
+    Returns:
+        dict: {group: {code: prerequisites}}, groups and courses in file order. Returns None if the file
+        cannot be found.
+    """
+    try:
+        groups = {}
+        with open(filename, "r") as file:
+            next(file)
+            for line in file:
+                elements = line.strip().split(",")
+                if len(elements) < 2:
+                    continue
+                groups.setdefault(elements[0], {})[elements[1]] = elements[2:]
+        return groups
+    except FileNotFoundError:
+        print("File Not Found")
+
+
+def limit_credits(semester, max_credits):
+    """
+    Caps the requested credit hours at the university limit (18 for a regular semester, 9 for the summer).
+    """
+    if semester == 'summer':
+        return min(max_credits, 9)
+    return min(max_credits, 18)
+
+
 def get_user_preferences():
     """
        Asks the user to input their preferences for minimum free days and maximum credits per week for each semester,
@@ -342,15 +465,46 @@ def get_user_preferences():
             input("What is the minimum number of free days you want per week, for the {} semester?".format(semester)))
         max_credits = int(
             input("What is the maximum number of credits you want to register, for the {} semester?".format(semester)))
-        if semester == 'summer':
-            max_credits = min(max_credits, 9)
-        else:
-            max_credits = min(max_credits, 18)
+        max_credits = limit_credits(semester, max_credits)
         userPrefs[semester] = {
             "min_free_days": min_free_days, "max_credits": max_credits}
     return userPrefs
 
 
+def read_user_preferences(file_path):
+    """
+       Reads user preferences from a JSON file with the same layout get_user_preferences returns, e.g.
+       {"first": {"min_free_days": 1, "max_credits": 18}, "second": {...}, "summer": {...}}.
+
+       Returns:
+       - userPrefs (dict): the preferences, with the credit hours capped like get_user_preferences does.
+    """
+    with open(file_path, "r") as file:
+        return parse_user_preferences(json.load(file))
+
+
+def parse_user_preferences(data: dict):
+    """
+       Checks and converts preferences already decoded from JSON, see read_user_preferences.
+       Raises KeyError for a missing semester or max_credits, ValueError or TypeError for other invalid values.
+    """
+    if not isinstance(data, dict):
+        raise TypeError("the preferences must be an object")
+    userPrefs = {}
+    for semester in ["first", "second", "summer"]:
+        values = data[semester]
+        if not isinstance(values, dict):
+            raise TypeError(f"the {semester} preferences must be an object")
+        min_free_days = int(values.get("min_free_days", 0))
+        max_credits = int(values["max_credits"])
+        if min_free_days < 0 or max_credits < 0:
+            raise ValueError(f"the {semester} min_free_days and max_credits cannot be negative")
+        userPrefs[semester] = {
+            "min_free_days": min_free_days,
+            "max_credits": limit_credits(semester, max_credits)}
+    return userPrefs
+
+
 def getPre(study_plan: dict):
     """
     Returns a dictionary of course prerequisites, based on a given study plan.
@@ -454,23 +608,13 @@ def check_overlapping(day1, time1, day2, time2):
         Returns:
             A boolean value indicating whether the two courses have overlapping class times.
     """
-    # Check if both courses have class on the same day
-    if day1 == day2:
-        # Get the start and end times for both courses
-        start_time1, end_time1 = time1.split(' - ')
-        start_time2, end_time2 = time2.split(' - ')
-        # Convert the start and end times to datetime objects
-        start_time1 = datetime.datetime.strptime(start_time1, '%H:%M')
-        end_time1 = datetime.datetime.strptime(end_time1, '%H:%M')
-        start_time2 = datetime.datetime.strptime(start_time2, '%H:%M')
-        end_time2 = datetime.datetime.strptime(end_time2, '%H:%M')
-        # Check if the time intervals for both courses intersect
-        if start_time1 < end_time2 and start_time2 < end_time1:
-            return True
-        else:
-            return False
-    else:
+    # compatibility wrapper: the planner itself compares the precompiled section masks
+    if day1 != day2:
         return False
+    start_time1, end_time1 = parse_time_range(time1)
+    start_time2, end_time2 = parse_time_range(time2)
+    # Check if the time intervals for both courses intersect
+    return start_time1 < end_time2 and start_time2 < end_time1
 
 
 def getElective(code: str, electives: dict, passed_courses):
@@ -533,188 +677,1035 @@ def generateTime(registered_courses_list: [Course], new_course, max_attempts=100
     return new_course
 
 
+def get_plan_groups(study_plan: dict, order, pre_priority: dict):
+    """
+    Returns the study plan entries in the order the greedy engine considers them, as a list of groups.
+
+    Args:
+        order (str): "plan" keeps the study plan order, one group per plan semester (at most one course of a
+            group is placed per semester). "priority" sorts every entry by pre_priority, highest first, keeping
+            the study plan order between equal priorities, each entry in its own group.
+    """
+    groups = []
+    for year in study_plan.keys():
+        for semester, values in study_plan[year].items():
+            groups.append(values)
+    if order == "plan":
+        return groups
+    entries = [value for values in groups for value in values]
+    entries.sort(key=lambda value: pre_priority.get(value['course'], 0), reverse=True)
+    return [[value] for value in entries]
+
+
+def plan_semester_greedy(study_plan: dict, passed_codes: list, catalog, max_hours, pre_priority: dict,
+                         min_free_days=0, graph: PrerequisiteGraph = None, order="priority", stats=None):
+    """
+    The first-fit engine: walks the study plan entries in priority order (see get_plan_groups), pulling in
+    missing prerequisites first, and takes the first section bundle of a course (a section of each of its
+    types, see CourseCatalog.get_bundles) that does not clash with the courses already chosen.
+
+    Args:
+        study_plan (dict): The study plan, as returned by readStudyPlan.
+        passed_codes (list): Codes of the courses passed before this semester.
+        catalog (CourseCatalog): The sections offered this semester.
+        max_hours (int): The credit hours the student wants at most.
+        pre_priority (dict): Priority of each course, e.g. PrerequisiteGraph.get_priorities().
+        min_free_days (int): Days of the week that must stay without classes.
+        graph (PrerequisiteGraph): The prerequisite graph of the study plan, built from it if omitted.
+        order (str): "priority" (default) or "plan", the original study plan order.
+        stats (PlannerStats): Counts the work done and the sections rejected, if given.
+
+    Returns:
+        A tuple (current_courses, current_semester_codes) with the chosen courses and their codes.
+    """
+    if graph is None:
+        graph = PrerequisiteGraph(study_plan)
+    passed = set(passed_codes)
+    # the passed courses and the courses chosen this semester
+    taken_codes = set(passed_codes)
+    current_semester_codes = []
+    current_courses: list[Course] = []
+    # time patterns of current_courses (see CourseCatalog.build_conflicts), and the days they are held on
+    occupied_patterns = 0
+    occupied_days = 0
+    max_busy_days = get_max_busy_days(min_free_days)
+    reserved_hours = 0
+    for values in get_plan_groups(study_plan, order, pre_priority):
+        for value in values:
+            possible_scheduling = []
+            course_code = value['course']
+            pre_req = value['prerequisites']
+            if course_code not in taken_codes:
+                # the missing prerequisites of this course only
+                needed_pre = [any_pre for any_pre in pre_req
+                              if any_pre not in taken_codes and not graph.is_unknown(any_pre)]
+                pre_flag = 1
+                if len(needed_pre) > 0:
+                    temp_possible = []
+                    for needed in needed_pre:
+                        if stats is not None:
+                            stats.count("prerequisite_expansions")
+                        # a prerequisite passed this semester is not passed yet
+                        if not graph.is_eligible(needed, passed):
+                            if stats is not None:
+                                stats.reject("missing_prerequisite", needed)
+                            pre_flag = 0
+                            break
+                        if stats is not None:
+                            stats.count("section_lookups")
+                        temp_possible.extend(catalog.get_bundles(needed))
+                        break_flag = 0
+                        for possible in temp_possible:
+                            if reserved_hours > max_hours or (
+                                    reserved_hours + get_hours(needed)) > max_hours:
+                                if stats is not None:
+                                    stats.reject("credit_cap", needed)
+                                break_flag = 1
+                                pre_flag = 0
+                                break
+                            low_priority = []
+                            if not possible.hasSchedule():
+                                continue
+                            # would the bundle take away one of the free days the student asked for?
+                            if (occupied_days | possible.getDayMask()).bit_count() > max_busy_days:
+                                if stats is not None:
+                                    stats.reject("free_days", needed)
+                                pre_flag = 0
+                                continue
+                            if len(current_courses) == 0:
+                                current_courses.extend(possible.getSections())
+                                occupied_patterns |= possible.getPatternBits()
+                                occupied_days |= possible.getDayMask()
+                                taken_codes.add(needed)
+                                reserved_hours += get_hours(needed)
+                                break_flag = 1
+                                current_semester_codes.append(needed)
+                                break
+                            # compare with the existed courses
+                            else:
+                                insert_flag = 1
+                                # check if there is an overlapping in current schedule:
+                                if stats is not None:
+                                    stats.count("overlap_checks")
+                                if possible.getConflicts() & occupied_patterns:
+                                    if stats is not None:
+                                        stats.reject("conflict", needed)
+                                    insert_flag = 0
+                                    pre_flag = 0
+                                if insert_flag:
+                                    current_courses.extend(possible.getSections())
+                                    occupied_patterns |= possible.getPatternBits()
+                                    occupied_days |= possible.getDayMask()
+                                    taken_codes.add(needed)
+                                    reserved_hours += get_hours(needed)
+                                    current_semester_codes.append(needed)
+                                    break_flag = 1
+                                    pre_flag = 1
+                                    break
+                        if break_flag:
+                            break
+                # the course itself waits until every prerequisite is passed, not just chosen this semester
+                if pre_flag and not graph.is_eligible(course_code, passed):
+                    if stats is not None:
+                        stats.reject("missing_prerequisite", course_code)
+                    pre_flag = 0
+                # add the course to the schedule
+                if pre_flag:
+                    if stats is not None:
+                        stats.count("section_lookups")
+                        if not any(bundle.hasSchedule() for bundle in catalog.get_bundles(course_code)):
+                            stats.reject("not_offered", course_code)
+                    possible_scheduling.extend(catalog.get_bundles(course_code))
+            # choose one section bundle !
+            break_flag = 0
+            for possible in possible_scheduling:
+                if reserved_hours > max_hours or (reserved_hours + get_hours(course_code)) > max_hours:
+                    if stats is not None:
+                        stats.reject("credit_cap", course_code)
+                    break_flag = 1
+                    break
+                if not possible.hasSchedule():
+                    continue
+                # would the bundle take away one of the free days the student asked for?
+                if (occupied_days | possible.getDayMask()).bit_count() > max_busy_days:
+                    if stats is not None:
+                        stats.reject("free_days", course_code)
+                    continue
+                if len(current_courses) == 0:
+                    current_courses.extend(possible.getSections())
+                    occupied_patterns |= possible.getPatternBits()
+                    occupied_days |= possible.getDayMask()
+                    taken_codes.add(course_code)
+                    reserved_hours += get_hours(course_code)
+                    break_flag = 1
+                    current_semester_codes.append(course_code)
+                    break
+                # compare with the existed courses
+                else:
+                    insert_flag = 1
+                    # check if there is an overlapping in current schedule:
+                    if stats is not None:
+                        stats.count("overlap_checks")
+                    if possible.getConflicts() & occupied_patterns:
+                        if stats is not None:
+                            stats.reject("conflict", course_code)
+                        insert_flag = 0
+                    if insert_flag:
+                        current_courses.extend(possible.getSections())
+                        occupied_patterns |= possible.getPatternBits()
+                        occupied_days |= possible.getDayMask()
+                        taken_codes.add(course_code)
+                        reserved_hours += get_hours(course_code)
+                        current_semester_codes.append(course_code)
+                        break_flag = 1
+                        break
+            if break_flag:
+                break
+
+    return current_courses, current_semester_codes
+
+
+def get_semester_candidates(study_plan: dict, passed_codes, catalog, max_hours, graph: PrerequisiteGraph,
+                            stats=None):
+    """
+    Lists the courses that can be registered this semester: not passed yet, every prerequisite passed, offered
+    with at least one scheduled section bundle, and not heavier than max_hours.
+
+    Returns:
+        list: (code, hours, bundles) tuples in study plan order. Bundles with identical times are kept once,
+            since they are interchangeable for the search.
+    """
+    passed = set(passed_codes)
+    candidates = []
+    seen = set()
+    for year in study_plan.keys():
+        for semester, values in study_plan[year].items():
+            for value in values:
+                code = value['course']
+                if code in passed or code in seen:
+                    continue
+                seen.add(code)
+                hours = get_hours(code)
+                if hours == 0 or hours > max_hours:
+                    if stats is not None:
+                        stats.reject("credit_cap", code)
+                    continue
+                if stats is not None:
+                    stats.count("prerequisite_expansions")
+                if not graph.is_eligible(code, passed):
+                    if stats is not None:
+                        stats.reject("missing_prerequisite", code)
+                    continue
+                if stats is not None:
+                    stats.count("section_lookups")
+                bundles = []
+                masks = set()
+                for bundle in catalog.get_bundles(code):
+                    if bundle.getMask() and bundle.getMask() not in masks:
+                        masks.add(bundle.getMask())
+                        bundles.append(bundle)
+                if bundles:
+                    candidates.append((code, hours, bundles))
+                elif stats is not None:
+                    stats.reject("not_offered", code)
+    return candidates
+
+
+def plan_semester_exact(study_plan: dict, passed_codes: list, catalog, max_hours, pre_priority: dict,
+                        min_free_days=0, graph: PrerequisiteGraph = None, time_budget=1.0, stats=None):
+    """
+    Exact engine: searches the section bundle assignment of the semester with backtracking, maximizing the registered
+    credit hours and then the total priority of the chosen courses.
+
+    Branches are cut when even taking every remaining course cannot beat the best assignment found, and
+    clashes are checked with the conflict graph of the catalog. Bundles that would leave fewer than min_free_days free days
+    are never tried. The search stops after time_budget seconds and returns the
+    best assignment found so far. stats (PlannerStats) counts the work done and the sections rejected, if given.
+
+    Returns:
+        A tuple (current_courses, current_semester_codes) with the chosen courses and their codes.
+    """
+    if graph is None:
+        graph = PrerequisiteGraph(study_plan)
+    candidates = get_semester_candidates(study_plan, passed_codes, catalog, max_hours, graph, stats)
+    # heavy and much needed courses first, so good assignments are found early and the bound cuts sooner
+    candidates.sort(key=lambda candidate: (candidate[1], pre_priority.get(candidate[0], 0)), reverse=True)
+    priorities = [pre_priority.get(code, 0) for code, hours, bundles in candidates]
+    # hours and priority still available from candidate i onwards
+    remaining_hours = [0] * (len(candidates) + 1)
+    remaining_priority = [0] * (len(candidates) + 1)
+    for i in range(len(candidates) - 1, -1, -1):
+        remaining_hours[i] = remaining_hours[i + 1] + candidates[i][1]
+        remaining_priority[i] = remaining_priority[i + 1] + priorities[i]
+
+    deadline = time.perf_counter() + time_budget
+    best = {"score": (-1, -1), "picks": []}
+    picks = []
+    nodes = 0
+    # the search visits many nodes, its checks and rejections go to stats once, when it ends
+    overlap_checks = 0
+    rejections = collections.Counter()
+
+    max_busy_days = get_max_busy_days(min_free_days)
+
+    def search(i, hours, priority, occupied_patterns, occupied_days):
+        nonlocal nodes, overlap_checks
+        nodes += 1
+        if nodes % 1024 == 0 and time.perf_counter() > deadline:
+            return True
+        if (hours, priority) > best["score"]:
+            best["score"] = (hours, priority)
+            best["picks"] = list(picks)
+        if i == len(candidates):
+            return False
+        if (min(max_hours, hours + remaining_hours[i]), priority + remaining_priority[i]) <= best["score"]:
+            return False
+        code, course_hours, bundles = candidates[i]
+        if hours + course_hours <= max_hours:
+            for bundle in bundles:
+                if (occupied_days | bundle.getDayMask()).bit_count() > max_busy_days:
+                    if stats is not None:
+                        rejections["free_days", code] += 1
+                    continue
+                if stats is not None:
+                    overlap_checks += 1
+                if bundle.getConflicts() & occupied_patterns:
+                    if stats is not None:
+                        rejections["conflict", code] += 1
+                    continue
+                picks.append(bundle)
+                timed_out = search(i + 1, hours + course_hours, priority + priorities[i],
+                                   occupied_patterns | bundle.getPatternBits(),
+                                   occupied_days | bundle.getDayMask())
+                picks.pop()
+                if timed_out:
+                    return True
+        elif stats is not None:
+            rejections["credit_cap", code] += 1
+        return search(i + 1, hours, priority, occupied_patterns, occupied_days)
+
+    timed_out = search(0, 0, 0, 0, 0)
+    if stats is not None:
+        stats.count("overlap_checks", overlap_checks)
+        for (reason, code), amount in rejections.items():
+            stats.reject(reason, code, amount)
+        stats.count("search_nodes", nodes)
+        stats.count("search_timeouts", int(bool(timed_out)))
+    # report the chosen courses in study plan order
+    order = {code: index for index, code in enumerate(getPre(study_plan))}
+    chosen = sorted(best["picks"], key=lambda bundle: order[bundle.getCode()])
+    return [section for bundle in chosen for section in bundle.getSections()], [bundle.getCode() for bundle in chosen]
+
+
+# weights of the schedule option score; bonuses must stay positive and penalties (minutes) negative for
+# iter_semester_options to yield options in score order
+SCORE_WEIGHTS = {"credits": 10.0, "free_days": 4.0, "early_minutes": -0.02, "gap_minutes": -0.01, "instructor": 2.0}
+# classes starting before this minute of the day count as early
+EARLY_START = 10 * 60
+WEEK_DAY_MASK = sum(1 << DAY_INDEX[day] for day in WEEK_DAYS)
+
+
+class ScheduleOption:
+    """
+    One conflict-free section combination for a semester, with the metrics it was scored on.
+    """
+
+    def __init__(self, score, sections: list, metrics: dict):
+        self.score = score
+        self.sections = sections
+        self.metrics = metrics
+
+    def get_score(self):
+        return self.score
+
+    def get_sections(self):
+        return self.sections
+
+    def get_metrics(self):
+        return self.metrics
+
+    def get_codes(self):
+        # the sections of a course's bundle are next to each other
+        return list(dict.fromkeys(section.getCode() for section in self.sections))
+
+    def to_schedule(self, year, semester) -> Schedule:
+        return Schedule(year, semester, list(self.sections))
+
+    def __str__(self):
+        return f"{self.score:.2f}: {', '.join(section.getKey() for section in self.sections)} {self.metrics}"
+
+
+def get_first_starts(bundle):
+    """
+    Returns the minute of the day the first class of a section bundle starts on, per day of DAYS
+    (MINUTES_PER_DAY on days without classes).
+    """
+    first_starts = [MINUTES_PER_DAY] * len(DAYS)
+    for start, end in bundle.getIntervals():
+        day = start // MINUTES_PER_DAY
+        first_starts[day] = min(first_starts[day], start % MINUTES_PER_DAY)
+    return tuple(first_starts)
+
+
+def get_early_minutes(first_starts):
+    return sum(EARLY_START - start for start in first_starts if start < EARLY_START)
+
+
+def get_option_metrics(bundles, preferred_instructors=()):
+    """
+    Measures a combination of section bundles (one per course): credit hours, free week days, minutes of class
+    before EARLY_START (per day, from the first class), idle minutes between classes of the same day, and courses
+    with a preferred instructor in one of their sections.
+    """
+    days = 0
+    intervals_by_day = {}
+    for bundle in bundles:
+        days |= bundle.getDayMask()
+        for start, end in bundle.getIntervals():
+            intervals_by_day.setdefault(start // MINUTES_PER_DAY, []).append((start, end))
+    early_minutes = 0
+    gap_minutes = 0
+    for day, intervals in intervals_by_day.items():
+        intervals.sort()
+        early_minutes += max(0, EARLY_START - (intervals[0][0] - day * MINUTES_PER_DAY))
+        latest_end = intervals[0][1]
+        for start, end in intervals[1:]:
+            gap_minutes += max(0, start - latest_end)
+            latest_end = max(latest_end, end)
+    return {"credits": sum(get_hours(bundle.getCode()) for bundle in bundles),
+            "free_days": len(WEEK_DAYS) - (days & WEEK_DAY_MASK).bit_count(),
+            "early_minutes": early_minutes,
+            "gap_minutes": gap_minutes,
+            "instructor": sum(1 for bundle in bundles if is_preferred(bundle, preferred_instructors))}
+
+
+def is_preferred(bundle, preferred_instructors):
+    return any(instructor in preferred_instructors for instructor in bundle.getInstructors())
+
+
+def iter_semester_options(codes, catalog, min_free_days=0, weights: dict = None, preferred_instructors=(),
+                          min_hours=None):
+    """
+    Lazily yields the conflict-free section combinations of a semester's courses, best score first.
+
+    A best-first search over the courses in order (take one of its section bundles, see
+    CourseCatalog.get_bundles, or leave the course out while min_hours can still be reached). Every partial
+    combination is ranked by an optimistic bound of the score it can still reach, from the bundles of the
+    remaining courses that fit it (one AND per bundle against the time patterns of the combination, see
+    CourseCatalog.get_conflicts): each fitting course adds its credits and preferred instructor, and a course
+    that cannot be left out costs at least the free days and early minutes of its cheapest fitting bundle. Gaps
+    are only counted on complete combinations. A branch where a course that cannot be left out has no fitting
+    bundle is pruned as a whole. A complete combination is yielded once no partial one can beat
+    it, so taking the first k options only expands what those k need.
+
+    Args:
+        codes: The courses of the semester, e.g. the codes of a Schedule of create_schedules.
+        catalog (CourseCatalog): The sections offered in the semester.
+        min_free_days: Week days that must stay free of classes.
+        weights (dict): Weights of the metrics of get_option_metrics, SCORE_WEIGHTS by default.
+        preferred_instructors: Instructor names that earn the "instructor" weight.
+        min_hours: Least credit hours of an option. By default every course with scheduled bundles is taken.
+
+    Yields:
+        ScheduleOption: in order of decreasing score.
+    """
+    if weights is None:
+        weights = SCORE_WEIGHTS
+    preferred_instructors = frozenset(preferred_instructors)
+    max_busy_days = get_max_busy_days(min_free_days)
+    # (code, hours, bundles) per course, each bundle as (bundle, conflicts, pattern bits, day mask,
+    # first starts, preferred);
+    # bundles with the same times and instructor preference score alike and are kept once
+    candidates = []
+    for code in dict.fromkeys(codes):
+        distinct = {}
+        for bundle in catalog.get_bundles(code):
+            preferred = is_preferred(bundle, preferred_instructors)
+            if bundle.getMask() and (bundle.getMask(), preferred) not in distinct:
+                distinct[(bundle.getMask(), preferred)] = (bundle, bundle.getConflicts(), bundle.getPatternBits(),
+                                                           bundle.getDayMask(), get_first_starts(bundle), preferred)
+        if distinct:
+            candidates.append((code, get_hours(code), list(distinct.values())))
+    # credit hours of the courses from candidate i onwards
+    remaining_hours = [0] * (len(candidates) + 1)
+    for i in range(len(candidates) - 1, -1, -1):
+        remaining_hours[i] = remaining_hours[i + 1] + candidates[i][1]
+    if min_hours is None:
+        min_hours = remaining_hours[0]
+
+    def bound(i, hours, occupied_patterns, occupied_days, first_starts, instructor):
+        slack = hours + remaining_hours[i] - min_hours
+        if slack < 0:
+            return None
+        fitting = []
+        for code, course_hours, bundles in candidates[i:]:
+            new_days = None
+            for bundle, conflicts, pattern_bits, day_mask, bundle_starts, preferred in bundles:
+                if conflicts & occupied_patterns or (occupied_days | day_mask).bit_count() > max_busy_days:
+                    continue
+                days = ((occupied_days | day_mask) & WEEK_DAY_MASK).bit_count()
+                early = get_early_minutes(map(min, first_starts, bundle_starts))
+                if new_days is None:
+                    new_days, new_early, new_preferred = days, early, preferred
+                else:
+                    new_days, new_early = min(new_days, days), min(new_early, early)
+                    new_preferred = new_preferred or preferred
+            if new_days is None:
+                slack -= course_hours
+                if slack < 0:
+                    return None
+            else:
+                fitting.append((course_hours, new_days, new_early, new_preferred))
+        busy_days = (occupied_days & WEEK_DAY_MASK).bit_count()
+        early_minutes = get_early_minutes(first_starts)
+        for course_hours, new_days, new_early, new_preferred in fitting:
+            hours += course_hours
+            instructor += new_preferred
+            if course_hours > slack:
+                busy_days = max(busy_days, new_days)
+                early_minutes = max(early_minutes, new_early)
+        return (weights.get("credits", 0) * hours + weights.get("free_days", 0) * (len(WEEK_DAYS) - busy_days)
+                + weights.get("early_minutes", 0) * early_minutes + weights.get("instructor", 0) * instructor)
+
+    counter = itertools.count()
+    no_classes = (MINUTES_PER_DAY,) * len(DAYS)
+    root_bound = bound(0, 0, 0, 0, no_classes, 0)
+    heap = [] if root_bound is None else [(-root_bound, 0, next(counter), 0, (), 0, 0, 0, no_classes, 0, None)]
+    while heap:
+        negative_bound, _, _, i, picks, hours, occupied_patterns, occupied_days, first_starts, instructor, metrics = \
+            heapq.heappop(heap)
+        if metrics is not None:
+            yield ScheduleOption(-negative_bound, [section for bundle in picks for section in bundle.getSections()],
+                                 metrics)
+            continue
+        if i == len(candidates):
+            # complete: rank it by its exact score, gaps included
+            metrics = get_option_metrics(picks, preferred_instructors)
+            option_score = sum(weights.get(name, 0) * value for name, value in metrics.items())
+            heapq.heappush(heap, (-option_score, -i, next(counter), i, picks, hours, occupied_patterns,
+                                  occupied_days, first_starts, instructor, metrics))
+            continue
+        code, course_hours, bundles = candidates[i]
+        children = []
+        if hours + remaining_hours[i + 1] >= min_hours:
+            children.append((picks, hours, occupied_patterns, occupied_days, first_starts, instructor))
+        for bundle, conflicts, pattern_bits, day_mask, bundle_starts, preferred in bundles:
+            if conflicts & occupied_patterns or (occupied_days | day_mask).bit_count() > max_busy_days:
+                continue
+            children.append((picks + (bundle,), hours + course_hours, occupied_patterns | pattern_bits,
+                             occupied_days | day_mask, tuple(map(min, first_starts, bundle_starts)),
+                             instructor + preferred))
+        for child in children:
+            child_bound = bound(i + 1, *child[1:])
+            if child_bound is not None:
+                # ties go to the deeper combination, so the search runs down to complete ones
+                heapq.heappush(heap, (-child_bound, -(i + 1), next(counter), i + 1) + child + (None,))
+
+
+def get_top_semester_options(schedule: Schedule, k=5, **options):
+    """
+    Returns the k best section combinations for the courses of a planned semester (a Schedule of
+    create_schedules), see iter_semester_options for the options. Only what the k options need is searched.
+    """
+    codes = list(dict.fromkeys(course.get_code() for course in schedule.get_courses()))
+    catalog = get_catalog(schedule.get_semester())
+    return list(itertools.islice(iter_semester_options(codes, catalog, **options), k))
+
+
+# per-semester planning engines selectable by name in create_schedules
+SCHEDULER_ENGINES = {"greedy": plan_semester_greedy, "exact": plan_semester_exact}
+
+# semester -> key of the user preferences
+SEMESTER_KEYS = {1: "first", 2: "second", 3: "summer"}
+# course rankings of the extra greedy plans the lookahead tries per state, see GraduationProjection.get_priorities
+LOOKAHEAD_ORDERS = ("offering_chain", "postpone_cost")
+# most rejection events a PlannerStats trace keeps
+TRACE_LIMIT = 10000
+
+
+def get_engine_options(engine, time_budget=1.0, beam_width=0):
+    """
+    Builds the engine_options of create_schedules from the command line options.
+    """
+    engine_options = {"time_budget": time_budget} if engine == "exact" else {}
+    if beam_width:
+        engine_options["beam_width"] = beam_width
+    return engine_options or None
+
+
+def get_reachable_courses(study_plan: dict, graph: PrerequisiteGraph, offerings: OfferingIndex):
+    """
+    Returns the study plan courses the planner can ever place: offered with scheduled times in at least one
+    semester, and every prerequisite (transitively) a reachable course too. Unknown prerequisites (Y3, Y4) count
+    as satisfied, as in every engine (see PrerequisiteGraph.is_eligible); placeholders like ENCS53xx and courses
+    without class times (e.g. training) are not reachable.
+    """
+    reachable = set()
+    for code in graph.topological_order:
+        if offerings.is_offered(code) and graph.is_eligible(code, reachable):
+            reachable.add(code)
+    return reachable & set(getPre(study_plan))
+
+
+class GraduationProjection:
+    """
+    Projects in which semester a student can pass every reachable study plan course (see get_reachable_courses),
+    for the lookahead planner. The projection is optimistic: every course is taken as soon as its prerequisites
+    are passed and a semester offers it (see OfferingIndex), and the remaining credit hours are spread over the
+    coming semesters at the preferred maximum.
+    """
+
+    def __init__(self, study_plan: dict, graph: PrerequisiteGraph, offerings: OfferingIndex, max_credits: dict):
+        """
+        Args:
+            max_credits (dict): semester -> the most credit hours the student takes in it.
+        """
+        self.graph = graph
+        self.offerings = offerings
+        # negative limits count as 0: no semester takes back hours
+        self.max_credits = {semester: max(0, hours) for semester, hours in max_credits.items()}
+        # the credit hours of a whole year (one of every semester)
+        self.cycle_credits = sum(self.max_credits.values())
+        # the reachable courses and every prerequisite on the way to them, in prerequisite order
+        required = get_reachable_courses(study_plan, graph, offerings)
+        for code in list(required):
+            required |= graph.get_all_prerequisites(code)
+        self.required = [code for code in graph.topological_order if code in required]
+        self.required_set = frozenset(self.required)
+        # (code, semester) -> get_tail
+        self.tails = {}
+
+    def get_tail(self, code, semester):
+        """
+        Returns the semesters from taking a course in the given semester to passing the last required course
+        that depends on it, with every course on the way taken in the first semester offering it.
+        """
+        key = (code, semester)
+        if key not in self.tails:
+            tail = 0
+            following = get_next_semester(semester)
+            for dependent in self.graph.dependents.get(code, ()):
+                if dependent in self.required_set:
+                    wait = self.offerings.get_wait(dependent, following)
+                    tail = max(tail, 1 + wait + self.get_tail(dependent, get_next_semester(following, wait)))
+            self.tails[key] = tail
+        return self.tails[key]
+
+    def get_postpone_cost(self, code, semester):
+        """
+        Returns how many semesters later the chain of a course ends when it is not taken in the given semester
+        but in the next one offering it, e.g. a summer-only course put off for a year.
+        """
+        wait = self.offerings.get_wait(code, get_next_semester(semester))
+        later = get_next_semester(semester, 1 + wait)
+        return 1 + wait + self.get_tail(code, later) - self.get_tail(code, semester)
+
+    def get_priorities(self, order, semester, pre_priority: dict):
+        """
+        Ranks the courses for a greedy plan of the given semester, as pre_priority does for plan_semester_greedy.
+        "offering_chain" puts the longest chains of the semester first (get_tail), "postpone_cost" the courses
+        whose chains are delayed the most when they are put off (get_postpone_cost); pre_priority breaks ties.
+        """
+        scale = max(pre_priority.values(), default=0) + 1
+        tail_scale = (max((self.get_tail(code, semester) for code in self.required), default=0) + 1) * scale
+        priorities = dict(pre_priority)
+        for code in self.required:
+            if not self.offerings.is_offered(code, semester):
+                continue
+            priority = self.get_tail(code, semester) * scale + pre_priority.get(code, 0)
+            if order == "postpone_cost":
+                priority += self.get_postpone_cost(code, semester) * tail_scale
+            priorities[code] = priority
+        return priorities
+
+    def project(self, passed, semester):
+        """
+        Returns the least number of semesters, from the given one on, needed to pass the required courses that
+        are not in passed (0 when none is left).
+        """
+        # semester (counted from the given one) each remaining course can be passed in at the earliest
+        earliest = {}
+        hours = 0
+        for code in self.required:
+            if code in passed:
+                continue
+            start = 0
+            for pre in self.graph.get_required(code):
+                if pre in earliest:
+                    start = max(start, earliest[pre] + 1)
+            earliest[code] = start + self.offerings.get_wait(code, get_next_semester(semester, start))
+            hours += get_hours(code)
+        if not earliest:
+            return 0
+        semesters = max(earliest.values()) + 1
+        if self.cycle_credits > 0:
+            # whole years first, then the semesters of the last year until the hours are covered
+            years = max(0, -(-hours // self.cycle_credits) - 1)
+            hours -= years * self.cycle_credits
+            credit_semesters = years * len(self.max_credits)
+            while hours > 0:
+                hours -= self.max_credits[get_next_semester(semester, credit_semesters)]
+                credit_semesters += 1
+            semesters = max(semesters, credit_semesters)
+        return semesters
+
+
+def plan_horizon_lookahead(study_plan: dict, student_state: StudentState, user_preferences: dict,
+                           num_of_semesters: int, current_semester, pre_priority: dict, graph: PrerequisiteGraph,
+                           beam_width=4, engine="greedy", engine_options=None, elective_index: ElectiveIndex = None):
+    """
+    Lookahead mode of create_schedules: a beam search over the whole horizon instead of one semester at a time.
+
+    Every kept state (the semesters planned so far) is extended with a few plans of its next semester: the
+    engine's own, and a greedy plan per ranking of LOOKAHEAD_ORDERS, which see courses only offered in some
+    semesters and long prerequisite chains. The children are scored by their projected graduation semester
+    (see GraduationProjection), then by the credit hours passed, and the beam_width best distinct ones are
+    kept. A wider beam keeps more alternatives at the cost of more planning time; ties go to the engine's plan.
+    Every state fills the elective placeholders of its semester with elective_index, see get_semester_study_plan.
+
+    Returns:
+        list: (current_courses, current_semester_codes) per planned semester, as the engines return them.
+    """
+    engine_function = SCHEDULER_ENGINES[engine] if isinstance(engine, str) else engine
+    if elective_index is None:
+        elective_index = ElectiveIndex.from_electives({})
+    offerings = build_offering_index(graph.courses)
+    max_credits = {semester: user_preferences[key]['max_credits'] for semester, key in SEMESTER_KEYS.items()}
+    projection = GraduationProjection(study_plan, graph, offerings, max_credits)
+    rankings = {}
+    # (score, student state, plans, semester the remaining courses were passed in or None)
+    beam = [((0,), student_state, [], None)]
+    semester = current_semester
+    for depth in range(1, num_of_semesters + 1):
+        key = SEMESTER_KEYS[semester]
+        max_hours = user_preferences[key]['max_credits']
+        min_free_days = user_preferences[key].get('min_free_days', 0)
+        catalog = get_catalog(semester)
+        if semester not in rankings:
+            rankings[semester] = [projection.get_priorities(order, semester, pre_priority)
+                                  for order in LOOKAHEAD_ORDERS]
+        children = []
+        for score, state, plans, finished in beam:
+            semester_plan = get_semester_study_plan(study_plan, elective_index, state.passed, catalog, graph,
+                                                    pre_priority)
+            plan_options = [engine_function(semester_plan, state.passed, catalog, max_hours, pre_priority,
+                                            min_free_days=min_free_days, graph=graph, **(engine_options or {}))]
+            plan_options.extend(plan_semester_greedy(semester_plan, state.passed, catalog, max_hours, priorities,
+                                                     min_free_days=min_free_days, graph=graph)
+                                for priorities in rankings[semester])
+            for option_index, option in enumerate(plan_options):
+                child_state = state.copy()
+                child_state.update(option[1])
+                remaining = projection.project(child_state.passed, get_next_semester(semester))
+                if finished is None and remaining == 0:
+                    child_finished = depth
+                else:
+                    child_finished = finished
+                graduation = child_finished if child_finished is not None else depth + remaining
+                children.append(((graduation, -child_state.passed_hours, option_index), child_state,
+                                 plans + [option], child_finished))
+        children.sort(key=lambda child: child[0])
+        beam = []
+        seen = set()
+        for child in children:
+            passed = frozenset(child[1].passed)
+            if passed not in seen:
+                seen.add(passed)
+                beam.append(child)
+                if len(beam) == beam_width:
+                    break
+        semester = get_next_semester(semester)
+    return beam[0][2]
+
+
+class PlannerStats:
+    """
+    Optional instrumentation of create_schedules and its engines. Counts the overlap checks, section lookups,
+    prerequisite expansions and rejected sections (by reason: credit_cap, conflict, missing_prerequisite,
+    not_offered, free_days) of every planned semester, with its time. With trace, rejections are also kept
+    as events, to see why a semester came out empty: at most trace_limit of them, the others are only counted
+    in trace_dropped. The exact engine reports the rejections of its search once per (reason, course), with
+    their count, rather than one event per search node.
+
+    The planner only calls it behind "if stats is not None", so a run without stats pays one comparison per
+    hot-path step.
+    """
+
+    def __init__(self, trace=False, trace_limit=TRACE_LIMIT):
+        self.totals = collections.Counter()
+        # counters of the semester being planned
+        self.current = collections.Counter()
+        self.semesters = []
+        self.trace = [] if trace else None
+        self.trace_limit = trace_limit
+        self.trace_dropped = 0
+
+    def count(self, name, amount=1):
+        self.current[name] += amount
+
+    def reject(self, reason, code, amount=1):
+        self.current["rejected_" + reason] += amount
+        if self.trace is not None:
+            self.add_events([{"semester": len(self.semesters), "reason": reason, "code": code, "count": amount}])
+
+    def add_events(self, events):
+        room = max(0, self.trace_limit - len(self.trace))
+        self.trace.extend(events[:room])
+        self.trace_dropped += max(0, len(events) - room)
+
+    def add_semester(self, year, semester, engine, seconds, codes, cached):
+        """
+        Closes the counters of a planned semester.
+        """
+        self.semesters.append({"year": year,
+                               "semester": semester,
+                               "engine": engine if isinstance(engine, str) else engine.__name__,
+                               "seconds": seconds,
+                               "cached": cached,
+                               "courses": list(codes),
+                               "hours": sum(get_hours(code) for code in codes),
+                               "counters": dict(self.current)})
+        self.totals.update(self.current)
+        self.current = collections.Counter()
+
+    def merge(self, other: "PlannerStats"):
+        self.totals.update(other.totals)
+        self.semesters.extend(other.semesters)
+        if self.trace is not None and other.trace is not None:
+            self.add_events(other.trace)
+            self.trace_dropped += other.trace_dropped
+
+    def to_dict(self):
+        report = {"semesters_planned": len(self.semesters),
+                  "seconds": sum(semester["seconds"] for semester in self.semesters),
+                  "totals": dict(self.totals),
+                  "semesters": self.semesters}
+        if self.trace is not None:
+            report["trace"] = self.trace
+            report["trace_dropped"] = self.trace_dropped
+        return report
+
+    def report(self, slowest=5):
+        """
+        Returns the human readable summary: totals, empty semesters and the slowest semesters.
+        """
+        seconds = sum(semester["seconds"] for semester in self.semesters)
+        lines = [f"Planned {len(self.semesters)} semesters in {seconds * 1000:.1f} ms "
+                 f"({sum(1 for semester in self.semesters if semester['cached'])} from the plan cache)"]
+        for name, value in sorted(self.totals.items()):
+            lines.append(f"  {name:<32}{value:>10}")
+        empty = [semester for semester in self.semesters if not semester["courses"]]
+        if empty:
+            lines.append(f"{len(empty)} empty semesters, rejections of the first one: "
+                         + ", ".join(f"{name} {value}" for name, value in sorted(empty[0]["counters"].items())
+                                     if name.startswith("rejected_")))
+        for semester in sorted(self.semesters, key=lambda entry: entry["seconds"], reverse=True)[:slowest]:
+            lines.append(f"  Year {semester['year']} Semester {semester['semester']} ({semester['engine']}): "
+                         f"{semester['seconds'] * 1000:.2f} ms, {semester['hours']} hours, "
+                         f"{len(semester['courses'])} courses")
+        return lines
+
+
+class SemesterPlanCache:
+    """
+    Memoizes the per-semester step of create_schedules. Students with the same passed courses, semester and
+    preferences get the same semester, so it is planned once and reused.
+
+    Entries are keyed by (frozen passed set, semester, max_credits, min_free_days, engine, engine options) and
+    hold the chosen section ids and codes. The least recently used entries are evicted past max_size. With a
+    path, the entries are loaded from and saved to a pickle file; fingerprint (see get_planner_fingerprint)
+    must then identify the study plan and catalogs, entries saved with another fingerprint are ignored.
+
+    In a process pool every worker fills its own copy; take_changes and merge bring its new entries and
+    counters back to the parent, which saves the file (see map_students). Only a copy that take_changes was
+    called on records its new entries, so a serial run or the parent keeps nothing beyond max_size.
+    """
+
+    def __init__(self, max_size=4096, path=None, fingerprint=None):
+        self.max_size = max_size
+        self.path = path
+        self.fingerprint = fingerprint
+        self.entries: collections.OrderedDict = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # entries put since the last take_changes, None until it is first called
+        self.added: dict = None
+        if path is not None:
+            self.load()
+
+    @staticmethod
+    def make_key(passed, semester, preferences: dict, engine, engine_options):
+        engine_name = engine if isinstance(engine, str) else f"{engine.__module__}.{engine.__qualname__}"
+        return (frozenset(passed), semester, preferences['max_credits'], preferences.get('min_free_days', 0),
+                engine_name, tuple(sorted((engine_options or {}).items())))
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, section_ids, codes):
+        self.entries[key] = (tuple(section_ids), tuple(codes))
+        self.entries.move_to_end(key)
+        if self.added is not None:
+            self.added[key] = self.entries[key]
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def take_changes(self):
+        """
+        Returns the entries put and the hits and misses counted since the last call, and starts counting anew.
+        The entries put are recorded from the first call on.
+        """
+        changes = (list((self.added or {}).items()), self.hits, self.misses)
+        self.added = {}
+        self.hits = 0
+        self.misses = 0
+        return changes
+
+    def merge(self, entries, hits=0, misses=0):
+        """
+        Adds the changes of another copy of the cache (see take_changes), e.g. of a pool worker.
+        """
+        for key, (section_ids, codes) in entries:
+            self.put(key, section_ids, codes)
+        self.hits += hits
+        self.misses += misses
+
+    def get_stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as file:
+                fingerprint, entries = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            return
+        if fingerprint == self.fingerprint:
+            self.entries = collections.OrderedDict(entries)
+
+    def save(self):
+        if self.path is None:
+            return
+        write_atomic(self.path, pickle.dumps((self.fingerprint, list(self.entries.items())),
+                                             protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def get_planner_fingerprint(data: dict):
+    """
+    Identifies the study plan, electives and course browser files a SemesterPlanCache file was built with.
+    """
+    signatures = [get_source_signature(file_path) for semester, file_path in sorted(COURSE_BROWSER_FILES.items())]
+    content = repr((data["study_plan"], sorted(data["electives"].items()), sorted(data["priority_pres"].items()),
+                    sorted(data["elective_index"].group_of.items()), sorted(data["elective_index"].quotas.items()),
+                    sorted(data["elective_index"].placeholders.items()), signatures))
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def get_semester_study_plan(study_plan: dict, elective_index: ElectiveIndex, passed, catalog,
+                            graph: PrerequisiteGraph, pre_priority: dict):
+    """
+    Returns the study plan a semester is planned with: its elective placeholders (ENCS53xx, ENCS51xx, UE)
+    filled by electives offered in catalog whose prerequisites are passed, see ElectiveIndex.resolve_study_plan.
+    """
+    def is_available(code):
+        return graph.is_eligible(code, passed) and any(bundle.hasSchedule() for bundle in catalog.get_bundles(code))
+
+    return elective_index.resolve_study_plan(study_plan, passed, is_available, pre_priority)
+
+
 def create_schedules(study_plan: dict, passed_courses: dict, user_preferences: dict, electives: dict,
-                     num_of_semesters: int, current_semester, current_year, pre_priority: dict):
-    get_passed_codes = []
+                     num_of_semesters: int, current_semester, current_year, pre_priority: dict, verbose=True,
+                     engine="greedy", engine_options=None, prerequisite_graph: PrerequisiteGraph = None,
+                     student_state: StudentState = None, plan_cache: SemesterPlanCache = None,
+                     stats: PlannerStats = None, elective_index: ElectiveIndex = None):
+    """
+    Plans the next num_of_semesters semesters of a student, starting at current_year / current_semester.
+
+    Args:
+        engine: The per-semester engine, a name from SCHEDULER_ENGINES ("greedy" or "exact") or a function
+            with the same signature as plan_semester_greedy.
+        engine_options (dict): Extra keyword arguments for the engine, e.g. {"time_budget": 0.5} for "exact".
+            With "beam_width" (> 0) the whole horizon is planned at once by plan_horizon_lookahead, a beam
+            search keeping that many states per semester; the plan cache is not used then.
+        prerequisite_graph (PrerequisiteGraph): The graph of study_plan and electives, built here if omitted.
+        student_state (StudentState): The passed courses as a set, built from passed_courses if omitted.
+        plan_cache (SemesterPlanCache): Reuses the semesters already planned for the same passed courses.
+        stats (PlannerStats): Records the counters and the time of every planned semester.
+        elective_index (ElectiveIndex): Fills the elective placeholders of the study plan every semester,
+            built from electives (without groups) if omitted.
+
+    Returns:
+        list[Schedule]: One schedule per planned semester. passed_courses (and student_state) are updated
+        with the planned courses.
+    """
+    if prerequisite_graph is None:
+        prerequisite_graph = PrerequisiteGraph(study_plan, electives)
+    if student_state is None:
+        student_state = StudentState(passed_courses)
+    if elective_index is None:
+        elective_index = ElectiveIndex.from_electives(electives)
+    engine_options = dict(engine_options or {})
+    beam_width = engine_options.pop("beam_width", 0)
+    lookahead_plans = None
     schedulers_list: list[Schedule] = []
     sorted_dict = dict(sorted(electives.items(), key=lambda x: x[1], reverse=True))
-    for year in passed_courses.keys():
-        for semester, values in passed_courses[year].items():
-            for value in values:
-                get_passed_codes.append(value)
-                if value in sorted_dict.keys():
-                    del sorted_dict[value]
+    for value in student_state:
+        if value in sorted_dict.keys():
+            del sorted_dict[value]
 
     for i in range(num_of_semesters):
         first_requested = None
         if len(sorted_dict) > 0:
             first_requested = next(iter(sorted_dict))
-        key = ""
-        if current_semester == 1:
-            key = "first"
-        elif current_semester == 2:
-            key = "second"
-        elif current_semester == 3:
-            key = "summer"
+        key = SEMESTER_KEYS.get(current_semester, "")
         max_hours = user_preferences[key]['max_credits']
-        current_semester_codes = []
-        current_courses: list[Course] = []
-        reserved_hours = 0
-        needed_pre = []
-        for year in study_plan.keys():
-            for semester, values in study_plan[year].items():
-                for value in values:
-                    possible_scheduling = []
-                    course_code = value['course']
-                    pre_req = value['prerequisites']
-                    if course_code not in get_passed_codes:
-                        flag = 1
-                        for any_pre in pre_req:
-                            if any_pre not in get_passed_codes:
-                                needed_pre.append(any_pre)
-                                # course_code = any_pre
-                                flag = 0
-                        pre_flag = 1
-                        if len(needed_pre) > 0:
-                            temp_possible = []
-                            for needed in needed_pre:
-                                sign = 1
-                                pre_for_needed = get_specific_pre(study_plan, needed)
-                                if len(pre_for_needed) > 0:
-                                    for one in pre_for_needed:
-                                        if one not in get_passed_codes:
-                                            sign = 0
-                                if not sign:
-                                    pre_flag = 0
-                                    break
-                                if current_semester == 1:
-                                    for item in offered_list1:
-                                        if needed == item.getCode():
-                                            temp_possible.append(item)
-                                elif current_semester == 2:
-                                    for item in offered_list2:
-                                        if needed == item.getCode():
-                                            temp_possible.append(item)
-                                elif current_semester == 3:
-                                    for item in offered_list3:
-                                        if needed == item.getCode():
-                                            temp_possible.append(item)
-                                break_flag = 0
-                                for possible in temp_possible:
-                                    if reserved_hours > max_hours or (
-                                            reserved_hours + get_hours(needed)) > max_hours:
-                                        break_flag = 1
-                                        pre_flag = 0
-                                        break
-                                    low_priority = []
-                                    if len(possible.getSchedule()) == 0:
-                                        continue
-                                    if len(current_courses) == 0:
-                                        current_course = Course(possible.getCode(), possible.getSection(),
-                                                                possible.getCourseType(), possible.getInstructor(),
-                                                                possible.getSchedule())
-                                        current_courses.append(current_course)
-                                        get_passed_codes.append(needed)
-                                        reserved_hours += get_hours(needed)
-                                        break_flag = 1
-                                        current_semester_codes.append(needed)
-                                        if needed in sorted_dict.keys():
-                                            del sorted_dict[needed]
-                                        break
-                                    # compare with the existed courses
-                                    else:
-                                        insert_flag = 1
-                                        # check if there is an overlapping in current schedule:
-                                        for inner_day, inner_time in possible.getSchedule().items():
-                                            for course in current_courses:
-                                                if len(course.getScheduling()) == 0:
-                                                    break
-                                                for course_day, course_time in course.getScheduling().items():
-                                                    check = check_overlapping(inner_day, inner_time, course_day,
-                                                                              course_time)
-                                                    if check:
-                                                        insert_flag = 0
-                                                        pre_flag = 0
-                                                        break
-                                        if insert_flag:
-                                            current_course = Course(possible.getCode(), possible.getSection(),
-                                                                    possible.getCourseType(), possible.getInstructor(),
-                                                                    possible.getSchedule())
-                                            current_courses.append(current_course)
-                                            get_passed_codes.append(needed)
-                                            reserved_hours += get_hours(needed)
-                                            current_semester_codes.append(needed)
-                                            break_flag = 1
-                                            pre_flag = 1
-                                            if course_code in sorted_dict.keys():
-                                                del sorted_dict[needed]
-                                            break
-                                if break_flag:
-                                    break
-                        # add the course to the schedule
-                        if pre_flag:
-                            if current_semester == 1:
-                                for item in offered_list1:
-                                    if course_code == item.getCode():
-                                        possible_scheduling.append(item)
-
-                            elif current_semester == 2:
-                                for item in offered_list2:
-                                    if course_code == item.getCode():
-                                        possible_scheduling.append(item)
-                            elif current_semester == 3:
-                                for item in offered_list3:
-                                    if course_code == item.getCode():
-                                        possible_scheduling.append(item)
-                    # choose one section !
-                    break_flag = 0
-                    for possible in possible_scheduling:
-                        if reserved_hours > max_hours or (reserved_hours + get_hours(course_code)) > max_hours:
-                            break_flag = 1
-                            break
-                        if len(possible.getSchedule()) == 0:
-                            continue
-                        if len(current_courses) == 0:
-                            current_course = Course(possible.getCode(), possible.getSection(),
-                                                    possible.getCourseType(), possible.getInstructor(),
-                                                    possible.getSchedule())
-                            current_courses.append(current_course)
-                            get_passed_codes.append(course_code)
-                            reserved_hours += get_hours(course_code)
-                            break_flag = 1
-                            current_semester_codes.append(course_code)
-                            if course_code in sorted_dict.keys():
-                                del sorted_dict[course_code]
-                            break
-                        # compare with the existed courses
-                        else:
-                            insert_flag = 1
-                            # check if there is an overlapping in current schedule:
-                            for inner_day, inner_time in possible.getSchedule().items():
-                                for course in current_courses:
-                                    if len(course.getScheduling()) == 0:
-                                        continue
-                                    for course_day, course_time in course.getScheduling().items():
-                                        check = check_overlapping(inner_day, inner_time, course_day, course_time)
-                                        if check:
-                                            insert_flag = 0
-                                            break
-                            if insert_flag:
-                                current_course = Course(possible.getCode(), possible.getSection(),
-                                                        possible.getCourseType(), possible.getInstructor(),
-                                                        possible.getSchedule())
-                                current_courses.append(current_course)
-                                get_passed_codes.append(course_code)
-                                reserved_hours += get_hours(course_code)
-                                current_semester_codes.append(course_code)
-                                break_flag = 1
-                                if course_code in sorted_dict.keys():
-                                    del sorted_dict[course_code]
-                                break
-                    if break_flag:
-                        break
-
-        display_with_current(study_plan, passed_courses, get_passed_codes)
+        min_free_days = user_preferences[key].get('min_free_days', 0)
+        if stats is not None:
+            start = time.perf_counter()
+        catalog = get_catalog(current_semester)
+        if beam_width and lookahead_plans is None:
+            lookahead_plans = plan_horizon_lookahead(study_plan, student_state, user_preferences, num_of_semesters,
+                                                     current_semester, pre_priority, prerequisite_graph, beam_width,
+                                                     engine, engine_options, elective_index)
+        cache_key = None
+        cached = None
+        if plan_cache is not None and not beam_width:
+            cache_key = plan_cache.make_key(student_state.passed, current_semester, user_preferences[key], engine,
+                                            engine_options)
+            cached = plan_cache.get(cache_key)
+        if lookahead_plans is not None:
+            current_courses, current_semester_codes = lookahead_plans[i]
+        elif cached is not None:
+            current_courses = [catalog.get_section(section_id) for section_id in cached[0]]
+            current_semester_codes = list(cached[1])
+        else:
+            engine_function = SCHEDULER_ENGINES[engine] if isinstance(engine, str) else engine
+            # engines that are not instrumented need not take a stats argument
+            stats_option = {"stats": stats} if stats is not None else {}
+            semester_plan = get_semester_study_plan(study_plan, elective_index, student_state.passed, catalog,
+                                                    prerequisite_graph, pre_priority)
+            current_courses, current_semester_codes = engine_function(semester_plan, student_state.passed, catalog,
+                                                                      max_hours, pre_priority,
+                                                                      min_free_days=min_free_days,
+                                                                      graph=prerequisite_graph,
+                                                                      **engine_options, **stats_option)
+            if plan_cache is not None:
+                plan_cache.put(cache_key, [course.section_id for course in current_courses], current_semester_codes)
+        if stats is not None:
+            stats.add_semester(current_year, current_semester, engine, time.perf_counter() - start,
+                               current_semester_codes, cached is not None)
+        for code in current_semester_codes:
+            student_state.add(code)
+            if code in sorted_dict.keys():
+                del sorted_dict[code]
+
+        if verbose:
+            display_with_current(study_plan, passed_courses, student_state)
 
         for item in current_semester_codes:
             if current_year not in passed_courses:
@@ -726,48 +1717,26 @@ def create_schedules(study_plan: dict, passed_courses: dict, user_preferences: d
 
         current_schedule = Schedule(current_year, current_semester, current_courses)
         schedulers_list.append(current_schedule)
-        if current_semester == 1 or current_semester == 2:
-            current_semester += 1
-        elif current_semester == 3:
-            current_semester = 1
+        if current_semester == 3:
             current_year += 1
+        current_semester = get_next_semester(current_semester)
     return schedulers_list
 
 
 def print_schedules(schedule: Schedule, file_name=None):
-    days = ['M', 'T', 'W', 'R', 'S']
-
-    # initialize a nested dictionary to hold the schedule for each day
-    week_schedule = {day: {} for day in days}
-
-    # loop through the schedule data and populate the week_schedule dictionary
-    courses_list: list[Course] = []
-    if len(schedule.get_courses()) > 0:
-        courses_list = schedule.get_courses()
-    for course in courses_list:
-        for day, time in course.schedule.items():
-            if day in days:
-                # create a string representation of the class
-                class_str = f"{course.get_code()}-{course.get_instructor()}-{course.get_section()}"
-                # add the class to the schedule for the given day
-                week_schedule[day][time] = class_str
-
+    """
+    Prints a weekly schedule, or appends it to file_name in the SuggestedCourses.txt layout (in one write).
+    Use save_schedules to write all the schedules of a student at once.
+    """
     # print the weekly schedule
     if file_name is not None:
         try:
             with open(file_name, "a") as file:
-                file.write(f"Weekly Schedule for Year {schedule.get_year()} - Semester {schedule.get_semester()}:\n")
-                file.write("-----------------\n")
-                for day, classes in week_schedule.items():
-                    file.write(day + ":\n")
-                    if not classes:
-                        file.write("No Classes Scheduled\n")
-                    else:
-                        for time, class_name in sorted(classes.items()):
-                            file.write(f"  {time}: {class_name}\n")
+                file.write(format_text([schedule]))
         except FileNotFoundError:
             print(f"The File {file_name} cant be open")
     else:
+        week_schedule = get_week_schedule(schedule)
         print(f"Weekly Schedule for Year {schedule.get_year()} - Semester {schedule.get_semester()}:")
         print("-----------------")
         for day, classes in week_schedule.items():
@@ -780,29 +1749,20 @@ def print_schedules(schedule: Schedule, file_name=None):
             print()
 
 
-# Option 1
-study_plan = readStudyPlan("CEStudyPlan.txt")
-# get prerequisites
-pres = getPre(study_plan)
-# 2
-continue_flag = 1
-while continue_flag:
-    displayStudyPlan(study_plan)
-    print("=" * 50)
-    filename = input("Please enter the name and the location of the student records file: ")
-    while not os.path.isfile(filename):  # check if the file exists or not
-        print("File Not Found, Try Again")
-        filename = input("Please enter the name of the student records file: ")
-    student_records = read_student_records(filename)  # read student records
-    passed_courses = get_passed_courses(student_records)
-    # get number of remaining hours to be passed :
-    plan_hours, passed_hours = check_semesters(passed_courses)
-    remaining_hours = plan_hours - passed_hours
-    print(f"Major Credit Hours {plan_hours}, Passed Hours {passed_hours}")
-    # ===================================================================================
+def get_current_semester(passed_courses: dict, filename=None):
+    """
+    Works out the year and semester the student is about to register for, from their passed courses.
+
+    Args:
+        passed_courses (dict): The passed courses, organized by year and semester.
+        filename (str): The student records file the passed courses were read from, if any.
+
+    Returns:
+        A tuple (current_year, current_semester).
+    """
     current_semester = 0
     current_year = 1
-    if os.path.getsize(filename) == 0:
+    if filename is not None and os.path.getsize(filename) == 0:
         current_year = 1
         current_semester = 1
     else:
@@ -819,42 +1779,422 @@ while continue_flag:
         elif current_semester == 3:
             current_semester = 1
             current_year += 1
+    return current_year, current_semester
 
-    print(f"Current Year : {current_year}, Current Semester : {current_semester}")
-    print("=" * 50)
-    # 3
-    display_with_passed(study_plan, passed_courses)  # display the study plan with passed courses green colored
-    priority_pres = calculate_pre()
-    Electives = read_electives("Electives.txt")  # Read Elective Courses
-    print(f"Electives :\n{Electives}")
-    print("=" * 50)
-    # 4
-    user_preferences = get_user_preferences()
-    print("USER PREFERENCES: ")
-    print(user_preferences)
-    print("=" * 50)
-    # 5
-    num_of_semesters = int(
-        input("Please enter the number of semesters that the script should do the schedule planning for."))
-
-    result = create_schedules(study_plan, passed_courses, user_preferences, Electives,
-                              num_of_semesters, current_semester, current_year, priority_pres)
-    # Show The Result (Print the Schedules)
-    for schedule in result:
-        print_schedules(schedule)
-
-    answer = input("Do You Want To Save These Schedules To a Text File (Y/N)")
-    if answer == "y" or answer == "Y":
-        file_to_saved = "SuggestedCourses.txt"
-        with open(file_to_saved, "w") as file:
-            file.write("")
-        for sche in result:
-            print_schedules(sche, file_to_saved)
-        continue_flag = 0
-        print(f"Schedules Saved To The File {file_to_saved}\nBye!")
-    else:
-        answer = input("Do You Want To Exist Or Continue (e/E to exit, anything else to continue)")
-        if answer == "e" or answer == "E":
+
+# study plan, electives and prerequisite priorities, read once per process by load_planner_data
+planner_data = {}
+# the SemesterPlanCache used by plan_student when none is given (set by --plan-cache and in pool workers)
+semester_plan_cache: SemesterPlanCache = None
+# the PlannerStats plan_student records into when none is given (set by --profile)
+planner_stats: PlannerStats = None
+
+
+def load_planner_data(study_plan_file="CEStudyPlan.txt", electives_file="Electives.txt",
+                      elective_rules_file=ELECTIVE_RULES_FILE):
+    """
+    Reads the study plan, the electives and their rules (see electives.read_elective_rules) once and keeps them
+    for every student planned afterwards.
+
+    Returns:
+        dict: with the keys "study_plan", "electives", "elective_index", "priority_pres" and "prerequisite_graph".
+    """
+    key = (study_plan_file, electives_file, elective_rules_file)
+    if planner_data.get("key") != key:
+        store_plan.clear()
+        study_plan = readStudyPlan(study_plan_file)
+        elective_groups = read_elective_groups(electives_file) or {}
+        electives = {code: pre for courses in elective_groups.values() for code, pre in courses.items()}
+        prerequisite_graph = PrerequisiteGraph(study_plan, electives)
+        planner_data.clear()
+        planner_data.update({"key": key,
+                             "study_plan": study_plan,
+                             "electives": electives,
+                             "elective_index": ElectiveIndex.from_files(elective_groups, elective_rules_file),
+                             "prerequisite_graph": prerequisite_graph,
+                             "priority_pres": prerequisite_graph.get_priorities()})
+    return planner_data
+
+
+def plan_student(records_file, user_preferences: dict, num_of_semesters: int, data=None, engine="greedy",
+                 engine_options=None, plan_cache: SemesterPlanCache = None, stats: PlannerStats = None):
+    """
+    Plans the next semesters of one student without any interaction.
+
+    Args:
+        records_file (str): The student records file.
+        user_preferences (dict): Preferences in the layout returned by get_user_preferences.
+        num_of_semesters (int): How many semesters to plan.
+        data (dict): Planner data from load_planner_data. If omitted, the data already loaded in this
+            process is used, or the default files are read.
+        engine, engine_options: The scheduling engine, see create_schedules.
+        plan_cache (SemesterPlanCache): Memoized semesters, semester_plan_cache if omitted.
+        stats (PlannerStats): Planner counters and timings, planner_stats if omitted.
+
+    Returns:
+        list[Schedule]: One schedule per planned semester.
+    """
+    return plan_records(read_student_records(records_file), user_preferences, num_of_semesters, data, engine,
+                        engine_options, plan_cache, records_file, stats)
+
+
+def plan_records(student_records: dict, user_preferences: dict, num_of_semesters: int, data=None, engine="greedy",
+                 engine_options=None, plan_cache: SemesterPlanCache = None, records_file=None,
+                 stats: PlannerStats = None):
+    """
+    Plans the next semesters of a student from records already read (see read_student_records), e.g. records
+    received by the planning service. The arguments are those of plan_student.
+
+    Returns:
+        list[Schedule]: One schedule per planned semester.
+    """
+    if data is None:
+        data = planner_data if planner_data else load_planner_data()
+    passed_courses = get_passed_courses(student_records)
+    current_year, current_semester = get_current_semester(passed_courses, records_file)
+    return create_schedules(data["study_plan"], passed_courses, user_preferences, data["electives"],
+                            num_of_semesters, current_semester, current_year, data["priority_pres"], verbose=False,
+                            engine=engine, engine_options=engine_options,
+                            prerequisite_graph=data["prerequisite_graph"],
+                            plan_cache=plan_cache if plan_cache is not None else semester_plan_cache,
+                            stats=stats if stats is not None else planner_stats, elective_index=data["elective_index"])
+
+
+def save_schedules(schedules: list[Schedule], file_name, output_format="text"):
+    """
+    Writes the schedules to a file, replacing its old content: the SuggestedCourses.txt layout by default,
+    or "json" / "csv" (see schedule_writer). The file is replaced in one step, it is never seen half written.
+    """
+    try:
+        write_schedules(schedules, file_name, output_format)
+    except FileNotFoundError:
+        print(f"The File {file_name} cant be open")
+
+
+def read_manifest(path):
+    """
+    Lists the students of a batch run.
+
+    Args:
+        path (str): Either a directory, whose .txt files are all student records files, or a manifest file
+            with one student per line: "records_file" or "records_file,preferences_file". Relative paths
+            in a manifest are taken from the manifest's directory, lines starting with # are ignored.
+
+    Returns:
+        list: (records_file, preferences_file or None) tuples, in order. Manifest lines whose records or
+        preferences file does not exist are reported and left out, so one wrong line does not stop the batch.
+    """
+    if os.path.isdir(path):
+        return [(os.path.join(path, name), None) for name in sorted(os.listdir(path)) if name.endswith(".txt")]
+    entries = []
+    base = os.path.dirname(path)
+    with open(path, "r") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            element = [item.strip() for item in line.split(",")]
+            records_file = os.path.join(base, element[0])
+            preferences_file = os.path.join(base, element[1]) if len(element) > 1 and element[1] else None
+            missing = [file_path for file_path in (records_file, preferences_file)
+                       if file_path is not None and not os.path.isfile(file_path)]
+            if missing:
+                print(f"Skipping manifest line {line!r}: {', '.join(missing)} not found")
+                continue
+            entries.append((records_file, preferences_file))
+    return entries
+
+
+def get_output_names(records_files):
+    """
+    Names the output file of every records file of a batch: the records file name without its extension, or,
+    when records files in different directories share a name, their path from the directory they have in
+    common ("2023/s001.txt" -> "2023_s001"), so no student's output replaces another's.
+
+    Returns:
+        dict: records file -> output name, see get_output_path.
+    """
+    records_files = list(dict.fromkeys(records_files))
+    counts = collections.Counter(os.path.splitext(os.path.basename(file_path))[0] for file_path in records_files)
+    common = os.path.commonpath([os.path.abspath(file_path) for file_path in records_files or ["."]])
+    names = {}
+    used = set()
+    for index, file_path in enumerate(records_files):
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        if counts[name] > 1:
+            relative = os.path.relpath(os.path.abspath(file_path), common)
+            name = os.path.splitext(relative)[0].replace(os.sep, "_")
+        if name in used:
+            name = f"{index}_{name}"
+        used.add(name)
+        names[file_path] = name
+    return names
+
+
+def get_output_path(records_file, output_dir, output_format="text", name=None):
+    """
+    Returns the output file of a records file, named after it unless name (see get_output_names) is given.
+    """
+    if name is None:
+        name = os.path.splitext(os.path.basename(records_file))[0]
+    return os.path.join(output_dir, f"{name}_SuggestedCourses{OUTPUT_FORMATS[output_format][1]}")
+
+
+def plan_and_save(entry, user_preferences: dict, num_of_semesters: int, output_dir, engine="greedy",
+                  engine_options=None, output_format="text"):
+    """
+    Plans one batch entry, (records_file, preferences_file or None, output name), with the planner data of the
+    current process and saves its schedules.
+
+    Returns:
+        str: The output file of the student.
+    """
+    records_file, preferences_file, name = entry
+    if preferences_file is not None:
+        user_preferences = read_user_preferences(preferences_file)
+    schedules = plan_student(records_file, user_preferences, num_of_semesters, engine=engine,
+                             engine_options=engine_options)
+    output_file = get_output_path(records_file, output_dir, output_format, name)
+    save_schedules(schedules, output_file, output_format)
+    return output_file
+
+
+def init_planner_worker(study_plan_file, electives_file, elective_rules_file=ELECTIVE_RULES_FILE,
+                        plan_cache_path=None, plan_cache_size=0):
+    """
+    Pool initializer: makes sure a worker has the study plan, electives, catalogs and plan cache loaded.
+    Forked workers inherit them from the parent, so this only reads files in spawned workers.
+    A worker's plan cache is its own copy, its changes are sent back with every result (see run_with_plan_cache)
+    and only the parent process saves the cache file.
+    """
+    global semester_plan_cache
+    data = load_planner_data(study_plan_file, electives_file, elective_rules_file)
+    load_all_catalogs()
+    if plan_cache_size and semester_plan_cache is None:
+        semester_plan_cache = SemesterPlanCache(plan_cache_size, plan_cache_path, get_planner_fingerprint(data))
+    if semester_plan_cache is not None:
+        # the changes of a forked worker start from the parent's cache, not from what the parent counted
+        semester_plan_cache.take_changes()
+
+
+def run_with_plan_cache(function, item):
+    """
+    Calls function on an item in a pool worker, and returns its result with the changes of the worker's plan cache.
+    """
+    result = function(item)
+    return result, semester_plan_cache.take_changes()
+
+
+def map_students(function, items, workers=1, data=None):
+    """
+    Calls function on every item, in a process pool when workers > 1, and returns the results in input order.
+    The study plan and catalogs are loaded before the pool starts, so forked workers share them instead of re-reading.
+    """
+    if data is None:
+        data = load_planner_data()
+    load_all_catalogs()
+    if workers <= 1:
+        return [function(item) for item in items]
+    chunk_size = max(1, len(items) // (workers * 4))
+    cache_arguments = (None, 0)
+    if semester_plan_cache is not None:
+        cache_arguments = (semester_plan_cache.path, semester_plan_cache.max_size)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_planner_worker,
+                                                initargs=data["key"] + cache_arguments) as executor:
+        if semester_plan_cache is None:
+            return list(executor.map(function, items, chunksize=chunk_size))
+        # the semesters planned by the workers go to the parent's cache, which main() saves
+        results = []
+        for result, changes in executor.map(functools.partial(run_with_plan_cache, function), items,
+                                            chunksize=chunk_size):
+            semester_plan_cache.merge(*changes)
+            results.append(result)
+        return results
+
+
+def plan_cohort(records_files: list, user_preferences: dict, num_of_semesters: int, workers=1, data=None,
+                engine="greedy", engine_options=None):
+    """
+    Plans every student of a cohort, in parallel when workers > 1.
+
+    Returns:
+        list: The list of schedules of each student, in the order of records_files.
+    """
+    function = functools.partial(plan_student, user_preferences=user_preferences, num_of_semesters=num_of_semesters,
+                                 engine=engine, engine_options=engine_options)
+    return map_students(function, list(records_files), workers, data)
+
+
+def run_batch(entries, user_preferences: dict, num_of_semesters: int, output_dir, data=None, workers=1,
+              engine="greedy", engine_options=None, output_format="text"):
+    """
+    Plans every student of a batch and writes one SuggestedCourses-style file per student.
+
+    Args:
+        entries (list): (records_file, preferences_file or None) tuples, as returned by read_manifest.
+        user_preferences (dict): Preferences used for students without their own preferences file.
+        num_of_semesters (int): How many semesters to plan for each student.
+        output_dir (str): The directory the output files are written to.
+        data (dict): Planner data from load_planner_data, shared by all students.
+        workers (int): Number of worker processes, 1 plans in the current process.
+        engine, engine_options: The scheduling engine, see create_schedules.
+        output_format (str): "text", "json" or "csv", see save_schedules.
+
+    Returns:
+        list: The output file of each student, in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    function = functools.partial(plan_and_save, user_preferences=user_preferences,
+                                 num_of_semesters=num_of_semesters, output_dir=output_dir, engine=engine,
+                                 engine_options=engine_options, output_format=output_format)
+    names = get_output_names(records_file for records_file, preferences_file in entries)
+    items = [(records_file, preferences_file, names[records_file]) for records_file, preferences_file in entries]
+    return map_students(function, items, workers, data)
+
+
+def run_interactive(engine="greedy", engine_options=None, stats: PlannerStats = None):
+    # Option 1
+    study_plan = readStudyPlan("CEStudyPlan.txt")
+    # get prerequisites
+    pres = getPre(study_plan)
+    prerequisite_graph = PrerequisiteGraph(study_plan, read_electives("Electives.txt"))
+    for message in prerequisite_graph.report():
+        print(f"Warning: {message}")
+    # 2
+    continue_flag = 1
+    while continue_flag:
+        displayStudyPlan(study_plan)
+        print("=" * 50)
+        filename = input("Please enter the name and the location of the student records file: ")
+        while not os.path.isfile(filename):  # check if the file exists or not
+            print("File Not Found, Try Again")
+            filename = input("Please enter the name of the student records file: ")
+        student_records = read_student_records(filename)  # read student records
+        passed_courses = get_passed_courses(student_records)
+        # get number of remaining hours to be passed :
+        plan_hours, passed_hours = check_semesters(passed_courses)
+        remaining_hours = plan_hours - passed_hours
+        print(f"Major Credit Hours {plan_hours}, Passed Hours {passed_hours}")
+        # ===================================================================================
+        current_year, current_semester = get_current_semester(passed_courses, filename)
+
+        print(f"Current Year : {current_year}, Current Semester : {current_semester}")
+        print("=" * 50)
+        # 3
+        display_with_passed(study_plan, passed_courses)  # display the study plan with passed courses green colored
+        priority_pres = prerequisite_graph.get_priorities()
+        Electives = read_electives("Electives.txt")  # Read Elective Courses
+        elective_index = ElectiveIndex.from_files(read_elective_groups("Electives.txt") or {})
+        print(f"Electives :\n{Electives}")
+        print("=" * 50)
+        # 4
+        user_preferences = get_user_preferences()
+        print("USER PREFERENCES: ")
+        print(user_preferences)
+        print("=" * 50)
+        # 5
+        num_of_semesters = int(
+            input("Please enter the number of semesters that the script should do the schedule planning for."))
+
+        result = create_schedules(study_plan, passed_courses, user_preferences, Electives,
+                                  num_of_semesters, current_semester, current_year, priority_pres,
+                                  engine=engine, engine_options=engine_options,
+                                  prerequisite_graph=prerequisite_graph, stats=stats, elective_index=elective_index)
+        if stats is not None:
+            print("\n".join(stats.report()))
+        # Show The Result (Print the Schedules)
+        for schedule in result:
+            print_schedules(schedule)
+
+        answer = input("Do You Want To Save These Schedules To a Text File (Y/N)")
+        if answer == "y" or answer == "Y":
+            file_to_saved = "SuggestedCourses.txt"
+            save_schedules(result, file_to_saved)
             continue_flag = 0
+            print(f"Schedules Saved To The File {file_to_saved}\nBye!")
         else:
-            continue_flag = 1
+            answer = input("Do You Want To Exist Or Continue (e/E to exit, anything else to continue)")
+            if answer == "e" or answer == "E":
+                continue_flag = 0
+            else:
+                continue_flag = 1
+
+
+def save_profile(stats: PlannerStats, file_name):
+    if stats is None:
+        return
+    with open(file_name, "w") as file:
+        json.dump(stats.to_dict(), file, indent=2)
+    print(f"Planner profile saved to {file_name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Study schedule planner. Runs interactively unless --batch is given.")
+    parser.add_argument("--batch", help="a directory of student records files, or a manifest listing them")
+    parser.add_argument("--preferences", help="JSON preferences file used for every student of the batch")
+    parser.add_argument("--semesters", type=int, default=3, help="number of semesters to plan (default: 3)")
+    parser.add_argument("--output-dir", default="SuggestedCourses", help="where the batch output files are written")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default="text",
+                        help="format of the batch output files (default: text, the SuggestedCourses.txt layout)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes for --batch, 0 uses every CPU (default: 1)")
+    parser.add_argument("--engine", choices=sorted(SCHEDULER_ENGINES), default="greedy",
+                        help="greedy: first fit, most depended-on courses first (critical path order), "
+                             "exact: backtracking search (default: greedy)")
+    parser.add_argument("--time-budget", type=float, default=1.0,
+                        help="seconds the exact engine may search per semester (default: 1.0)")
+    parser.add_argument("--beam-width", type=int, default=0,
+                        help="plan the whole horizon with a lookahead beam search keeping this many candidate plans "
+                             "per semester, wider is slower and better (default: 0, one semester at a time)")
+    parser.add_argument("--plan-cache", metavar="FILE",
+                        help="memoize planned semesters in FILE, reused by later batch runs")
+    parser.add_argument("--plan-cache-size", type=int, default=4096,
+                        help="most semesters kept in the plan cache (default: 4096)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="count the planner's work per semester, print a summary and save the report "
+                             "to FILE as JSON")
+    parser.add_argument("--trace", type=int, nargs="?", const=TRACE_LIMIT, default=0, metavar="N",
+                        help="with --profile, also save the first N rejected sections as events "
+                             f"(default N: {TRACE_LIMIT})")
+    parser.add_argument("--study-plan", default="CEStudyPlan.txt")
+    parser.add_argument("--electives", default="Electives.txt")
+    parser.add_argument("--elective-rules", default=ELECTIVE_RULES_FILE,
+                        help="placeholders and quotas of the elective groups, a JSON file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    global planner_stats
+    if args.trace and args.profile is None:
+        parser.error("--trace needs --profile")
+    if args.profile is not None:
+        planner_stats = PlannerStats(trace=bool(args.trace), trace_limit=args.trace)
+    engine_options = get_engine_options(args.engine, args.time_budget, args.beam_width)
+    if args.batch is None:
+        run_interactive(args.engine, engine_options, planner_stats)
+        save_profile(planner_stats, args.profile)
+        return
+    if args.preferences is None:
+        parser.error("--batch needs --preferences")
+    if args.profile is not None and args.workers != 1:
+        parser.error("--profile counts the planner of this process, use it with --workers 1")
+    data = load_planner_data(args.study_plan, args.electives, args.elective_rules)
+    for message in data["prerequisite_graph"].report() + data["elective_index"].report():
+        print(f"Warning: {message}")
+    user_preferences = read_user_preferences(args.preferences)
+    workers = args.workers if args.workers > 0 else os.cpu_count()
+    global semester_plan_cache
+    if args.plan_cache is not None:
+        semester_plan_cache = SemesterPlanCache(args.plan_cache_size, args.plan_cache, get_planner_fingerprint(data))
+    outputs = run_batch(read_manifest(args.batch), user_preferences, args.semesters, args.output_dir, data, workers,
+                        args.engine, engine_options, args.format)
+    print(f"Planned {len(outputs)} students, schedules saved to {args.output_dir}")
+    if semester_plan_cache is not None:
+        semester_plan_cache.save()
+        stats = semester_plan_cache.get_stats()
+        print(f"Plan cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} semesters saved")
+    if planner_stats is not None:
+        print("\n".join(planner_stats.report()))
+        save_profile(planner_stats, args.profile)
+
+
+if __name__ == "__main__":
+    main()
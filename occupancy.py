@@ -0,0 +1,203 @@
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    # only the occupancy grid needs numpy, the planner does not
+    np = None
+
+from readCourses import COURSE_BROWSER_FILES, DAYS, MINUTES_PER_DAY, SLOT_MINUTES, get_catalog, intervals_to_slots, \
+    schedule_to_intervals
+
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+SLOTS_PER_WEEK = len(DAYS) * SLOTS_PER_DAY
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("The occupancy grid needs numpy, install it with: pip install numpy")
+
+
+def get_slot_time(slot):
+    """
+    Returns the day and the time ('HH:MM') a slot of the week starts at.
+    """
+    day, minute = divmod(slot * SLOT_MINUTES, MINUTES_PER_DAY)
+    return DAYS[day], f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class OccupancyGrid:
+    """
+    The weekly timetables of many sections as one boolean matrix, for bulk analysis with numpy: a row per
+    section, a column per SLOT_MINUTES slot of the week (DAYS x SLOTS_PER_DAY), True where the section has class.
+    Class times are widened to whole slots the way intervals_to_mask widens them, so the grid finds the same
+    clashes as the bitmask checks of the planner.
+
+    Sections with the same timetable clash with the same sections, so pairwise results are computed on the
+    distinct timetables (rows of patterns) and mapped back to the sections with pattern_of.
+    """
+
+    def __init__(self, sections):
+        require_numpy()
+        self.sections = list(sections)
+        rows, first_slots, end_slots = [], [], []
+        for row, section in enumerate(self.sections):
+            for first_slot, end_slot in intervals_to_slots(section.getIntervals()):
+                rows.append(row)
+                first_slots.append(first_slot)
+                end_slots.append(end_slot)
+        # +1 where a class starts and -1 where it ends, the running sum along the week is the occupancy
+        changes = np.zeros((len(self.sections), SLOTS_PER_WEEK + 1), dtype=np.int8)
+        np.add.at(changes, (np.array(rows, dtype=np.intp), np.array(first_slots, dtype=np.intp)), 1)
+        np.add.at(changes, (np.array(rows, dtype=np.intp), np.array(end_slots, dtype=np.intp)), -1)
+        self.grid = np.cumsum(changes[:, :SLOTS_PER_WEEK], axis=1, dtype=np.int8) > 0
+        # the distinct rows, found on the rows packed into bytes (np.unique on a 2-D boolean matrix is far slower)
+        packed = np.ascontiguousarray(np.packbits(self.grid, axis=1))
+        keys = packed.view(np.dtype((np.void, packed.shape[1]))).reshape(-1)
+        _, first_rows, self.pattern_of, self.pattern_counts = np.unique(keys, return_index=True, return_inverse=True,
+                                                                        return_counts=True)
+        self.pattern_of = self.pattern_of.reshape(-1)
+        self.patterns = self.grid[first_rows]
+        self.scheduled = self.grid.any(axis=1)
+        self.pattern_overlaps = None
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        return cls(catalog)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def get_pattern_overlaps(self):
+        """
+        Returns the slots shared by every pair of distinct timetables, as a square matrix.
+        """
+        if self.pattern_overlaps is None:
+            patterns = self.patterns.astype(np.float32)
+            self.pattern_overlaps = np.rint(patterns @ patterns.T).astype(np.int32)
+        return self.pattern_overlaps
+
+    def get_overlap_minutes(self, rows=None):
+        """
+        Returns the minutes every pair of sections share (rows x sections), for the given rows or every section.
+        """
+        pattern_rows = self.pattern_of if rows is None else self.pattern_of[rows]
+        return self.get_pattern_overlaps()[np.ix_(pattern_rows, self.pattern_of)] * SLOT_MINUTES
+
+    def get_conflict_matrix(self):
+        """
+        Returns the sections x sections matrix of clashes. A section with class times clashes with itself, as in
+        the conflict graph of CourseCatalog.
+        """
+        clashes = self.get_pattern_overlaps() > 0
+        return clashes[np.ix_(self.pattern_of, self.pattern_of)]
+
+    def get_conflict_counts(self):
+        """
+        Returns, for every section, how many other sections it clashes with.
+        """
+        clashes = (self.get_pattern_overlaps() > 0).astype(np.int64)
+        per_pattern = clashes @ self.pattern_counts
+        return per_pattern[self.pattern_of] - self.scheduled
+
+    def count_conflicting_pairs(self):
+        """
+        Returns how many unordered pairs of different sections clash.
+        """
+        return int(self.get_conflict_counts().sum()) // 2
+
+    def get_slot_loads(self):
+        """
+        Returns how many sections hold class in every slot of the week.
+        """
+        return self.grid.sum(axis=0)
+
+    def get_occupancy(self, sections):
+        """
+        Returns the slots a fixed timetable (e.g. the sections of a planned schedule) occupies, as one row.
+        """
+        occupancy = np.zeros(SLOTS_PER_WEEK, dtype=bool)
+        for section in sections:
+            for first_slot, end_slot in intervals_to_slots(section.getIntervals()):
+                occupancy[first_slot:end_slot] = True
+        return occupancy
+
+    def get_fitting(self, sections=(), schedule: dict = None):
+        """
+        Returns a boolean array over the sections of the grid: True for those that fit around a fixed
+        timetable, given as sections and/or a schedule dictionary ({day: 'HH:MM - HH:MM'}).
+        """
+        occupancy = self.get_occupancy(sections)
+        if schedule is not None:
+            for first_slot, end_slot in intervals_to_slots(schedule_to_intervals(schedule)):
+                occupancy[first_slot:end_slot] = True
+        return ~(self.grid & occupancy).any(axis=1)
+
+    def get_fitting_sections(self, sections=(), schedule: dict = None):
+        return [self.sections[row] for row in np.flatnonzero(self.get_fitting(sections, schedule))]
+
+    def get_pattern_conflicts(self, section_patterns):
+        """
+        Returns the conflict graph of CourseCatalog.build_conflicts (one clash bitmap per time pattern) from the
+        grid, for the time patterns numbered by section_patterns (the time pattern of every section, -1 for
+        sections without class times). Gives the same bitmaps as the interval sweep of build_conflict_graph.
+        """
+        count = max(section_patterns, default=-1) + 1
+        rows = np.zeros(count, dtype=np.intp)
+        for row, pattern in enumerate(section_patterns):
+            if pattern >= 0:
+                rows[pattern] = self.pattern_of[row]
+        clashes = (self.get_pattern_overlaps() > 0)[np.ix_(rows, rows)]
+        conflicts = []
+        for pattern in range(count):
+            bits = 0
+            for other in np.flatnonzero(clashes[pattern]):
+                bits |= 1 << int(other)
+            conflicts.append(bits)
+        return conflicts
+
+
+def report_catalog(semester, catalog, top=5):
+    """
+    Returns the human readable report of a catalog: sections, distinct timetables, clashing pairs, the sections
+    with the most clashes and the busiest slots of the week.
+    """
+    grid = OccupancyGrid.from_catalog(catalog)
+    lines = [f"Semester {semester} ({COURSE_BROWSER_FILES.get(semester, '')}): {len(grid)} sections, "
+             f"{len(grid.patterns)} distinct timetables, {grid.count_conflicting_pairs()} clashing pairs"]
+    counts = grid.get_conflict_counts()
+    for row in np.argsort(-counts, kind="stable")[:top]:
+        lines.append(f"  {grid.sections[row].getKey():<28}clashes with {counts[row]} sections")
+    loads = grid.get_slot_loads()
+    for slot in np.argsort(-loads, kind="stable")[:top]:
+        day, time = get_slot_time(int(slot))
+        lines.append(f"  {day} {time}: {loads[slot]} sections in class")
+    return lines
+
+
+def main_occupancy(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog-wide timetable analysis with a numpy occupancy grid.")
+    parser.add_argument("--semester", type=int, nargs="+", choices=sorted(COURSE_BROWSER_FILES),
+                        default=sorted(COURSE_BROWSER_FILES))
+    parser.add_argument("--top", type=int, default=5, help="sections and slots listed per catalog (default: 5)")
+    parser.add_argument("--fit", nargs="+", metavar="KEY",
+                        help="list the sections that fit around these sections (CODE-Type-Section keys)")
+    args = parser.parse_args(argv)
+    require_numpy()
+
+    for semester in args.semester:
+        catalog = get_catalog(semester)
+        if args.fit is None:
+            print("\n".join(report_catalog(semester, catalog, args.top)))
+            continue
+        by_key = {section.getKey(): section for section in catalog}
+        fixed = [by_key[key] for key in args.fit if key in by_key]
+        fitting = OccupancyGrid.from_catalog(catalog).get_fitting_sections(fixed)
+        print(f"Semester {semester}: {len(fitting)} of {len(catalog)} sections fit around "
+              f"{', '.join(section.getKey() for section in fixed) or 'nothing'}")
+        for section in fitting:
+            print(f"  {section}")
+
+
+if __name__ == "__main__":
+    main_occupancy()
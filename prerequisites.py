@@ -0,0 +1,178 @@
+class PrerequisiteGraph:
+    """
+        The prerequisite graph of a study plan and its electives, built once and then queried with set operations.
+
+        For every course it keeps the direct prerequisites, the transitive prerequisites (every course that has
+        to be passed before it), the courses depending on it, and its topological level (0 for courses without
+        prerequisites, otherwise one more than the highest level among its prerequisites).
+
+        Prerequisite codes that are neither a course of the study plan nor an elective (e.g. Y3, Y4) are kept in
+        unknown_codes, and prerequisite cycles in cycles, see report(). No course can be passed to satisfy an
+        unknown code, so every engine takes it as satisfied: is_eligible and get_missing only look at the
+        prerequisites that are courses (see get_required).
+    """
+
+    def __init__(self, study_plan: dict, electives: dict = None):
+        self.prerequisites: dict[str, frozenset] = {}
+        # courses in study plan order, followed by the electives
+        self.courses: list[str] = []
+        for year in study_plan.keys():
+            for semester, values in study_plan[year].items():
+                for value in values:
+                    self.add_course(value['course'], value['prerequisites'])
+        if electives is not None:
+            for code, pre in electives.items():
+                self.add_course(code, pre)
+
+        # prerequisite code -> courses requiring it, for codes that are not courses
+        self.unknown_codes: dict[str, list[str]] = {}
+        for code in self.courses:
+            for pre in sorted(self.prerequisites[code]):
+                if pre not in self.prerequisites:
+                    self.unknown_codes.setdefault(pre, []).append(code)
+        # the prerequisites that have to be passed: those that are courses
+        self.required: dict[str, frozenset] = {code: frozenset(pre for pre in self.prerequisites[code]
+                                                               if pre in self.prerequisites)
+                                               for code in self.courses}
+
+        self.dependents: dict[str, set] = {code: set() for code in self.courses}
+        for code in self.courses:
+            for pre in self.prerequisites[code]:
+                if pre in self.dependents:
+                    self.dependents[pre].add(code)
+
+        self.topological_order, self.cycles = self.sort_courses()
+        self.ancestors: dict[str, frozenset] = {}
+        self.level: dict[str, int] = {}
+        for code in self.topological_order:
+            ancestors = set(self.prerequisites[code])
+            level = 0
+            for pre in self.prerequisites[code]:
+                if pre in self.ancestors:
+                    ancestors |= self.ancestors[pre]
+                    level = max(level, self.level[pre] + 1)
+            self.ancestors[code] = frozenset(ancestors)
+            self.level[code] = level
+
+        self.descendants: dict[str, frozenset] = {}
+        # number of edges on the longest chain of courses that depend on a course (its critical path weight)
+        self.chain_length: dict[str, int] = {}
+        for code in reversed(self.topological_order):
+            descendants = set(self.dependents[code])
+            chain_length = 0
+            for dependent in self.dependents[code]:
+                if dependent in self.descendants:
+                    descendants |= self.descendants[dependent]
+                    chain_length = max(chain_length, self.chain_length[dependent] + 1)
+            self.descendants[code] = frozenset(descendants)
+            self.chain_length[code] = chain_length
+
+    def add_course(self, code, prerequisites):
+        pre = frozenset(item for item in prerequisites if item)
+        if code not in self.prerequisites:
+            self.courses.append(code)
+            self.prerequisites[code] = pre
+        else:
+            # a course listed twice (e.g. an elective slot) needs the prerequisites of every listing
+            self.prerequisites[code] = self.prerequisites[code] | pre
+
+    def sort_courses(self):
+        """
+            Orders the courses so every course comes after its prerequisites (Kahn's algorithm).
+
+            Returns:
+                A tuple (order, cycles). Courses on or behind a cycle are left out of order,
+                and every cycle found is returned as a list of course codes.
+        """
+        missing = {code: sum(1 for pre in self.prerequisites[code] if pre in self.prerequisites)
+                   for code in self.courses}
+        ready = [code for code in self.courses if missing[code] == 0]
+        order = []
+        while ready:
+            code = ready.pop(0)
+            order.append(code)
+            for dependent in sorted(self.dependents[code], key=self.courses.index):
+                missing[dependent] -= 1
+                if missing[dependent] == 0:
+                    ready.append(dependent)
+
+        cycles = []
+        blocked = [code for code in self.courses if missing[code] > 0]
+        seen = set()
+        for start in blocked:
+            if start in seen:
+                continue
+            # walk back through unsorted prerequisites until a course repeats
+            path = [start]
+            positions = {start: 0}
+            code = start
+            while True:
+                code = next(pre for pre in sorted(self.prerequisites[code]) if pre in self.prerequisites and missing[pre] > 0)
+                if code in positions:
+                    cycle = path[positions[code]:]
+                    if not seen.intersection(cycle):
+                        cycles.append(list(reversed(cycle)))
+                    break
+                if code in seen:
+                    break
+                positions[code] = len(path)
+                path.append(code)
+            seen.update(path)
+        return order, cycles
+
+    def __contains__(self, code):
+        return code in self.prerequisites
+
+    def get_prerequisites(self, code):
+        """
+            Returns the direct prerequisites of a course (empty for codes the graph does not know).
+        """
+        return self.prerequisites.get(code, frozenset())
+
+    def get_required(self, code):
+        """
+            Returns the direct prerequisites of a course that have to be passed, without the unknown codes.
+        """
+        return self.required.get(code, frozenset())
+
+    def is_unknown(self, code):
+        return code in self.unknown_codes
+
+    def get_all_prerequisites(self, code):
+        return self.ancestors.get(code, self.get_prerequisites(code))
+
+    def get_missing(self, code, passed):
+        """
+            Returns the direct prerequisites of a course that are not in the passed set, unknown codes aside.
+        """
+        return self.get_required(code) - passed
+
+    def is_eligible(self, code, passed):
+        """
+            Checks if every direct prerequisite of a course is in the passed set, unknown codes aside.
+        """
+        return self.get_required(code) <= passed
+
+    def get_descendant_count(self, code):
+        return len(self.descendants.get(code, ()))
+
+    def get_priority(self, code):
+        """
+            Returns the critical path weight of a course: the length of the longest chain of courses depending
+            on it first, then the number of courses depending on it.
+        """
+        return self.chain_length.get(code, 0) * (len(self.courses) + 1) + self.get_descendant_count(code)
+
+    def get_priorities(self):
+        return {code: self.get_priority(code) for code in self.courses}
+
+    def report(self):
+        """
+            Returns a list of human readable problems found while building the graph.
+        """
+        messages = []
+        for code, courses in self.unknown_codes.items():
+            messages.append(f"Unknown prerequisite {code} (required by {', '.join(courses)})")
+        for cycle in self.cycles:
+            messages.append(f"Prerequisite cycle: {' -> '.join(cycle + cycle[:1])}")
+        return messages
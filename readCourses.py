@@ -1,22 +1,178 @@
 import json
 import datetime
+import functools
+import gc
+import os
+import pickle
+import sys
+import time as timer
 
-with open("CourseBrowser1.json", "r") as file:
-    CoursesSemester1 = json.load(file)
-with open("CourseBrowser2.json", "r") as file:
-    CoursesSemester2 = json.load(file)
-with open("CourseBrowser3.json", "r") as file:
-    CoursesSemester3 = json.load(file)
+from schedule_writer import write_atomic
+
+# The course browser of each semester (1: first, 2: second, 3: summer)
+COURSE_BROWSER_FILES = {1: "CourseBrowser1.json", 2: "CourseBrowser2.json", 3: "CourseBrowser3.json"}
+# Bump whenever the pickled catalog layout changes, so stale caches are rebuilt
+CACHE_VERSION = 8
+
+# Day letters used by the course browser, in week order. Each day owns a block of
+# MINUTES_PER_DAY minutes in the minute-of-week numbering used by the intervals.
+DAYS = ['M', 'T', 'W', 'R', 'F', 'S', 'U']
+DAY_INDEX = {day: index for index, day in enumerate(DAYS)}
+# The days classes are held on, the ones a student can keep free
+WEEK_DAYS = ['M', 'T', 'W', 'R', 'S']
+MINUTES_PER_DAY = 24 * 60
+# Granularity of the conflict masks. Course browser times fall on 5 minute boundaries,
+# which keeps a whole week in ~2000 bits instead of ~10000.
+SLOT_MINUTES = 5
+
+
+@functools.lru_cache(maxsize=None)
+def parse_time_range(time):
+    """
+        Converts a time range in the format 'HH:MM - HH:MM' into (start, end) minutes after midnight.
+    """
+    start_time, end_time = time.split(' - ')
+    start_hour, start_minute = start_time.split(':')
+    end_hour, end_minute = end_time.split(':')
+    return int(start_hour) * 60 + int(start_minute), int(end_hour) * 60 + int(end_minute)
+
+
+def schedule_to_intervals(schedule: dict):
+    """
+        Converts a schedule dictionary ({day: 'HH:MM - HH:MM'}) into a sorted tuple of
+        half-open (start, end) minute-of-week intervals.
+    """
+    intervals = []
+    for day, time in schedule.items():
+        offset = DAY_INDEX[day] * MINUTES_PER_DAY
+        start, end = parse_time_range(time)
+        intervals.append((offset + start, offset + end))
+    return tuple(sorted(intervals))
+
+
+def intervals_to_mask(intervals):
+    """
+        Packs minute-of-week intervals into an integer with one bit per SLOT_MINUTES slot,
+        so two schedules overlap when their masks share a bit. Times that do not fall on a
+        slot boundary are widened to the enclosing slots, which can only add clashes, never hide one.
+    """
+    mask = 0
+    for start, end in intervals:
+        if end > start:
+            first_slot = start // SLOT_MINUTES
+            last_slot = -(-end // SLOT_MINUTES)
+            mask |= ((1 << (last_slot - first_slot)) - 1) << first_slot
+    return mask
+
+
+def schedule_to_mask(schedule: dict):
+    return intervals_to_mask(schedule_to_intervals(schedule))
+
+
+@functools.lru_cache(maxsize=None)
+def get_intervals_mask(intervals: tuple):
+    """
+        intervals_to_mask for the interval tuples of sections: sections with the same class times share one mask.
+    """
+    return intervals_to_mask(intervals)
+
+
+def intervals_to_slots(intervals):
+    """
+        Converts minute-of-week intervals into merged, sorted (first slot, end slot) ranges, widened the way
+        intervals_to_mask widens them, so two schedules share a slot range exactly when their masks share a bit.
+    """
+    slots = []
+    for start, end in sorted(intervals):
+        if end > start:
+            first_slot = start // SLOT_MINUTES
+            last_slot = -(-end // SLOT_MINUTES)
+            if slots and first_slot <= slots[-1][1]:
+                slots[-1] = (slots[-1][0], max(slots[-1][1], last_slot))
+            else:
+                slots.append((first_slot, last_slot))
+    return slots
+
+
+def build_conflict_graph(slot_ranges):
+    """
+        Finds which schedules clash with an interval sweep: the ranges are visited by start, and a range clashes
+        with exactly the ranges still open when it starts, so the work is O(n log n + conflicts) instead of
+        comparing every pair.
+
+        Args:
+            slot_ranges (list): The slot ranges of every schedule, as returned by intervals_to_slots.
+
+        Returns:
+            list: For every schedule, a bitmap with bit j set when it clashes with schedule j (a scheduled
+            schedule always clashes with itself).
+    """
+    conflicts = [0] * len(slot_ranges)
+    events = []
+    for index, ranges in enumerate(slot_ranges):
+        for first_slot, end_slot in ranges:
+            # ends sort before starts on the same slot, ranges are half-open
+            events.append((first_slot, 1, index))
+            events.append((end_slot, 0, index))
+        if ranges:
+            conflicts[index] = 1 << index
+    events.sort()
+    open_ranges = {}
+    for slot, is_start, index in events:
+        if not is_start:
+            del open_ranges[index]
+            continue
+        for other in open_ranges:
+            conflicts[index] |= 1 << other
+            conflicts[other] |= 1 << index
+        open_ranges[index] = slot
+    return conflicts
+
+
+def schedule_to_day_mask(schedule: dict):
+    """
+        Returns a bitmap with bit DAY_INDEX[day] set for every day the schedule has classes on.
+    """
+    day_mask = 0
+    for day in schedule.keys():
+        day_mask |= 1 << DAY_INDEX[day]
+    return day_mask
+
+
+def get_max_busy_days(min_free_days):
+    """
+        Converts a minimum number of free days into the number of days that may have classes.
+    """
+    if min_free_days <= 0:
+        return len(DAYS)
+    return max(0, len(WEEK_DAYS) - min_free_days)
 
 
 class OfferedCourses:
-    def __init__(self, code, section, course_type, instructor, schedule):
-        self.code = code
-        self.section = section
-        self.course_type = course_type
-        self.instructor = instructor
+    # large catalogs hold hundreds of thousands of sections, so they have no per-instance __dict__
+    __slots__ = ('code', 'section', 'course_type', 'instructor', 'schedule', 'intervals', 'mask', 'day_mask',
+                 'section_id', 'capacity')
+
+    def __init__(self, code, section, course_type, instructor, schedule, capacity=None, intervals=None):
+        # codes, types and instructors repeat across sections, interning stores each string once
+        self.code = sys.intern(code)
+        self.section = sys.intern(section)
+        self.course_type = sys.intern(course_type)
+        self.instructor = sys.intern(instructor) if instructor is not None else None
         self.schedule = schedule
-        self.new_code = f"{code}-{course_type}"
+        # precompiled form of the schedule, used for conflict checks (given by the catalog cache)
+        self.intervals = schedule_to_intervals(schedule) if intervals is None else intervals
+        # built on first use, see getMask
+        self.mask = None
+        self.day_mask = schedule_to_day_mask(schedule)
+        # position in its CourseCatalog, set when the section is added to one
+        self.section_id = None
+        # seats of the section, None when the course browser does not limit them
+        self.capacity = capacity
+
+    @property
+    def new_code(self):
+        return f"{self.code}-{self.course_type}"
 
     def __str__(self):
         return f"{self.code}-{self.course_type}-{self.section} : {self.instructor}\t {self.schedule}"
@@ -36,6 +192,48 @@ class OfferedCourses:
     def getSchedule(self):
         return self.schedule
 
+    def getSectionId(self):
+        return self.section_id
+
+    def getCapacity(self):
+        return self.capacity
+
+    def getKey(self):
+        """
+            Returns the course browser key of the section, CODE-Type-Section.
+        """
+        return f"{self.code}-{self.course_type}-{self.section}"
+
+    # the Course interface, so planned schedules can refer to catalog sections instead of copies
+    def get_code(self):
+        return self.code
+
+    def get_section(self):
+        return self.section
+
+    def get_instructor(self):
+        return self.instructor
+
+    def getScheduling(self):
+        return self.schedule
+
+    def getIntervals(self):
+        return self.intervals
+
+    def getMask(self):
+        if self.mask is None:
+            self.mask = get_intervals_mask(self.intervals)
+        return self.mask
+
+    def getDayMask(self):
+        return self.day_mask
+
+    def overlaps(self, other):
+        """
+            Checks if this section clashes with another section (or anything else with a minute-of-week mask).
+        """
+        return (self.getMask() & other.getMask()) != 0
+
     def getDetailedScheduling(self, timing):
         day, time = timing.items()
         # Split the value into start and end time using the '-' separator
@@ -49,54 +247,546 @@ class OfferedCourses:
         return day, time
 
 
-# Create a new dictionary with split keys
-offered_list1: list[OfferedCourses] = []
-for key, value in CoursesSemester1.items():
-    # Split the key into course code, type, and section number
-    code, course_type, section = key.split('-')
-    schedule = {}
-    instructor = None
-    for inner_key in value.keys():
-        if inner_key == 'Instructor':
-            instructor = value[inner_key]
-        elif inner_key is not None:
-            schedule[inner_key] = value[inner_key]
+class SectionBundle:
+    """
+        One registrable combination of the sections of a course: a section of every component type the course is
+        offered with (e.g. a Lecture and a Lab), none of them clashing with another. The planners place bundles,
+        so a Lecture never goes without its Lab.
 
-    # Add the value to the new dictionary with the new key
-    course = OfferedCourses(code, section, course_type, instructor, schedule)
-    offered_list1.append(course)
+        Its mask, day mask, intervals and conflicts are those of all its sections together.
+    """
+    __slots__ = ('code', 'sections', 'mask', 'day_mask', 'intervals', 'conflicts', 'pattern_bits')
 
-offered_list2: list[OfferedCourses] = []
-for key, value in CoursesSemester2.items():
-    # Split the key into course code, type, and section number
-    code, course_type, section = key.split('-')
-    schedule = {}
-    instructor = None
-    for inner_key in value.keys():
-        if inner_key == 'Instructor':
-            instructor = value[inner_key]
-        elif inner_key is not None:
-            schedule[inner_key] = value[inner_key]
+    def __init__(self, sections, conflicts=0, pattern_bits=0):
+        self.code = sections[0].getCode()
+        self.sections = tuple(sections)
+        self.mask = 0
+        self.day_mask = 0
+        intervals = []
+        for section in self.sections:
+            self.mask |= section.getMask()
+            self.day_mask |= section.getDayMask()
+            intervals.extend(section.getIntervals())
+        self.intervals = tuple(sorted(intervals))
+        self.conflicts = conflicts
+        self.pattern_bits = pattern_bits
+
+    def __str__(self):
+        return " + ".join(str(section) for section in self.sections)
+
+    def getCode(self):
+        return self.code
+
+    def getSections(self):
+        return self.sections
+
+    def getKey(self):
+        return "+".join(section.getKey() for section in self.sections)
+
+    def getInstructors(self):
+        return [section.getInstructor() for section in self.sections]
+
+    def hasSchedule(self):
+        return any(section.getSchedule() for section in self.sections)
+
+    def getMask(self):
+        return self.mask
+
+    def getDayMask(self):
+        return self.day_mask
+
+    def getIntervals(self):
+        return self.intervals
+
+    def getConflicts(self):
+        """
+            Returns the bitmap of the time patterns (see CourseCatalog.build_conflicts) the bundle clashes with.
+        """
+        return self.conflicts
+
+    def getPatternBits(self):
+        return self.pattern_bits
 
-    # Add the value to the new dictionary with the new key
-    course = OfferedCourses(code, section, course_type, instructor, schedule)
-    offered_list2.append(course)
 
-offered_list3: list[OfferedCourses] = []
-for key, value in CoursesSemester3.items():
+class CourseCatalog:
+    """
+        An index over the sections offered in one semester, built once when the course browser is read.
+
+        Sections are kept in the order they appear in the course browser file, so a lookup returns the
+        same sections, in the same order, as a linear scan of the offered list would.
+    """
+
+    def __init__(self, sections=None):
+        self.sections: list[OfferedCourses] = []
+        self.by_code: dict[str, list[OfferedCourses]] = {}
+        self.by_code_and_type: dict[tuple[str, str], list[OfferedCourses]] = {}
+        # the conflict graph, see build_conflicts: the time pattern of every section (by section id) and, for
+        # every time pattern, a bitmap of the time patterns it clashes with
+        self.section_patterns: list[int] = None
+        self.pattern_conflicts: list[int] = None
+        # course code -> its SectionBundles, see build_bundles
+        self.bundles: dict[str, list[SectionBundle]] = {}
+        if sections is not None:
+            for section in sections:
+                self.add(section)
+
+    def add(self, section: OfferedCourses):
+        section.section_id = len(self.sections)
+        self.sections.append(section)
+        self.by_code.setdefault(section.getCode(), []).append(section)
+        self.by_code_and_type.setdefault((section.getCode(), section.getCourseType()), []).append(section)
+        self.section_patterns = self.pattern_conflicts = None
+        self.bundles = {}
+
+    def build_conflicts(self):
+        """
+            Precomputes which sections clash, so the planners test a section against everything already picked
+            with one AND (see get_conflicts). Sections with the same class times clash with the same sections,
+            so the graph is built over their distinct time patterns: its size follows the number of different
+            timetables, not the number of sections. Sections without class times get no pattern (-1).
+        """
+        patterns = {}
+        slot_ranges = []
+        self.section_patterns = []
+        for section in self.sections:
+            if not section.getMask():
+                self.section_patterns.append(-1)
+                continue
+            if section.getMask() not in patterns:
+                patterns[section.getMask()] = len(slot_ranges)
+                slot_ranges.append(intervals_to_slots(section.getIntervals()))
+            self.section_patterns.append(patterns[section.getMask()])
+        self.pattern_conflicts = build_conflict_graph(slot_ranges)
+
+    def get_conflicts(self, section: OfferedCourses):
+        """
+            Returns the bitmap of the time patterns a section clashes with. A section clashes with a set of
+            picks when this bitmap shares a bit with the OR of their get_pattern_bit.
+        """
+        if self.section_patterns is None:
+            self.build_conflicts()
+        pattern = self.section_patterns[section.getSectionId()]
+        return self.pattern_conflicts[pattern] if pattern >= 0 else 0
+
+    def get_pattern_bit(self, section: OfferedCourses):
+        if self.section_patterns is None:
+            self.build_conflicts()
+        pattern = self.section_patterns[section.getSectionId()]
+        return 1 << pattern if pattern >= 0 else 0
+
+    def clashes(self, section: OfferedCourses, picked_patterns):
+        """
+            Checks if a section clashes with picks given as the OR of their get_pattern_bit.
+        """
+        return (self.get_conflicts(section) & picked_patterns) != 0
+
+    def build_bundles(self, code=None):
+        """
+            Precomputes the SectionBundles of a course, or of every course: one section of each of its types
+            (in the order the types first appear), every combination whose sections do not clash, checked with
+            one AND on the conflict graph. Within a type, sections with the same times and instructor are
+            interchangeable and only the first is used, so copies of a section do not multiply the bundles.
+            Bundles come in course browser order, for a course with one type they are its sections.
+        """
+        if code is None:
+            for code in self.by_code:
+                self.build_bundles(code)
+            return
+        # (sections, their conflicts, their pattern bits) of every partial combination
+        combinations = [((), 0, 0)]
+        for course_type in self.get_types(code):
+            distinct = {}
+            for section in self.get_sections(code, course_type):
+                distinct.setdefault((section.getMask(), section.getInstructor()), section)
+            combinations = [(sections + (section,), conflicts | self.get_conflicts(section),
+                             pattern_bits | self.get_pattern_bit(section))
+                            for sections, conflicts, pattern_bits in combinations
+                            for section in distinct.values()
+                            if not self.get_conflicts(section) & pattern_bits]
+        self.bundles[code] = [SectionBundle(sections, conflicts, pattern_bits)
+                              for sections, conflicts, pattern_bits in combinations if sections]
+
+    def get_bundles(self, code) -> list[SectionBundle]:
+        """
+            Returns the SectionBundles of a course, empty if it is not offered or its components always clash.
+        """
+        if code not in self.bundles:
+            self.build_bundles(code)
+        return self.bundles[code]
+
+    def get_section(self, section_id) -> OfferedCourses:
+        return self.sections[section_id]
+
+    def get_sections(self, code, course_type=None):
+        """
+            Returns the sections offered for a course code, optionally restricted to one course type
+            (Lecture, Lab, Discussion). Returns an empty list if the course is not offered.
+        """
+        if course_type is None:
+            return self.by_code.get(code, [])
+        return self.by_code_and_type.get((code, course_type), [])
+
+    def get_types(self, code):
+        return list(dict.fromkeys(section.getCourseType() for section in self.get_sections(code)))
+
+    def is_offered(self, code):
+        return code in self.by_code
+
+    def __contains__(self, code):
+        return code in self.by_code
+
+    def __len__(self):
+        return len(self.sections)
+
+    def __iter__(self):
+        return iter(self.sections)
+
+
+def make_offered_course(key, value: dict) -> OfferedCourses:
+    """
+        Creates the OfferedCourses of one course browser entry. The key has the form CODE-Type-Section
+        and the value holds the instructor, the schedule and optionally the seats ("Capacity").
+    """
     # Split the key into course code, type, and section number
     code, course_type, section = key.split('-')
     schedule = {}
     instructor = None
+    capacity = None
     for inner_key in value.keys():
         if inner_key == 'Instructor':
             instructor = value[inner_key]
+        elif inner_key == 'Capacity':
+            capacity = int(value[inner_key])
         elif inner_key is not None:
-            schedule[inner_key] = value[inner_key]
+            schedule[sys.intern(inner_key)] = sys.intern(value[inner_key])
+    return OfferedCourses(code, section, course_type, instructor, schedule, capacity)
+
+
+def read_offered_courses(courses: dict):
+    """
+        Converts the raw course browser dictionary into a list of OfferedCourses.
+    """
+    return [make_offered_course(key, value) for key, value in courses.items()]
+
+
+def iter_json_object(file, chunk_size=1 << 16):
+    """
+        Yields the (key, value) pairs of the JSON object stored in an open text file, one at a time, reading the
+        file in chunks. Only the current chunk and the entry being decoded are held in memory. A malformed
+        object raises ValueError with the offset (in characters) of the problem, as json.load would.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    # characters of the file dropped from the front of buffer
+    consumed = 0
+    end_of_file = False
+
+    def fill():
+        # drop what was consumed and append the next chunk, returns False at the end of the file
+        nonlocal buffer, position, consumed, end_of_file
+        chunk = file.read(chunk_size)
+        consumed += position
+        buffer = buffer[position:] + chunk
+        position = 0
+        end_of_file = not chunk
+        return bool(chunk)
+
+    def skip():
+        # skips whitespace, returns the next character ("" at the end)
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or not fill():
+                return buffer[position:position + 1]
+
+    def decode():
+        # decodes the JSON value at position, reading more of the file until it is complete
+        nonlocal position
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                # a number at the very end of the buffer may continue in the next chunk
+                if end < len(buffer) or end_of_file:
+                    position = end
+                    return value
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise
+            fill()
+
+    def expected(what):
+        found = buffer[position:position + 1]
+        return ValueError(f"Expected {what} at offset {consumed + position} of the course browser file, "
+                          f"found {found!r}" if found else f"Expected {what}, found the end of the course browser file")
+
+    if skip() != "{":
+        raise expected("a JSON object")
+    position += 1
+    character = skip()
+    # exactly one ',' between members, none before the first or after the last
+    while character != "}":
+        if character != '"':
+            raise expected("a key")
+        key = decode()
+        if skip() != ":":
+            raise expected(f"':' after {key!r}")
+        position += 1
+        skip()
+        yield key, decode()
+        character = skip()
+        if character == ",":
+            position += 1
+            if skip() != '"':
+                raise expected("a key")
+            character = '"'
+        elif character != "}":
+            raise expected("',' or '}'")
+    # nothing but whitespace may follow the object
+    position += 1
+    if skip():
+        raise expected("the end of the file")
+
+
+def iter_course_browser(file_path):
+    """
+        Yields the (key, value) entries of a course browser file without loading the whole file.
+        Files ending in .jsonl or .ndjson hold one JSON object per line (e.g. {"COMP111-Lecture-1": {...}}),
+        any other file a single JSON object.
+    """
+    with open(file_path, "r") as file:
+        if file_path.endswith((".jsonl", ".ndjson")):
+            for line in file:
+                if line.strip():
+                    yield from json.loads(line).items()
+        else:
+            yield from iter_json_object(file)
+
+
+def iter_offered_courses(file_path):
+    """
+        Yields the OfferedCourses of a course browser file one section at a time.
+    """
+    for key, value in iter_course_browser(file_path):
+        yield make_offered_course(key, value)
+
+
+def load_course_browser(file_path):
+    """
+        Reads a course browser JSON file and returns its raw dictionary.
+    """
+    with open(file_path, "r") as file:
+        return json.load(file)
+
+
+def get_cache_path(file_path):
+    """
+        Returns the path of the binary catalog cache kept next to a course browser file.
+    """
+    return os.path.splitext(file_path)[0] + ".pickle"
 
-    # Add the value to the new dictionary with the new key
-    course = OfferedCourses(code, section, course_type, instructor, schedule)
-    offered_list3.append(course)
+
+def get_source_signature(file_path):
+    """
+        Identifies the version of a course browser file, the cache is only used while it matches.
+    """
+    stat = os.stat(file_path)
+    return CACHE_VERSION, stat.st_mtime_ns, stat.st_size
+
+
+def get_catalog_columns(catalog):
+    """
+        Returns the compact form of a catalog the cache stores: its distinct timetables, as (schedule items,
+        intervals), one (code, section, type, instructor, capacity, timetable id) row per section, and its
+        conflict graph (section_patterns and pattern_conflicts, see CourseCatalog.build_conflicts), built here
+        if needed. Masks and bundles are not stored, the catalog builds them again on first use.
+    """
+    if catalog.section_patterns is None:
+        catalog.build_conflicts()
+    timetable_ids = {}
+    timetables = []
+    rows = []
+    for section in catalog:
+        timetable = tuple(section.getSchedule().items())
+        if timetable not in timetable_ids:
+            timetable_ids[timetable] = len(timetables)
+            timetables.append((timetable, section.getIntervals()))
+        rows.append((section.getCode(), section.getSection(), section.getCourseType(), section.getInstructor(),
+                     section.getCapacity(), timetable_ids[timetable]))
+    return timetables, rows, catalog.section_patterns, catalog.pattern_conflicts
+
+
+def catalog_from_columns(timetables, rows, section_patterns, pattern_conflicts) -> CourseCatalog:
+    """
+        Rebuilds a catalog from get_catalog_columns. Sections with the same timetable share its intervals.
+    """
+    timetables = [(dict(items), intervals) for items, intervals in timetables]
+    catalog = CourseCatalog(OfferedCourses(code, section, course_type, instructor, dict(timetables[timetable][0]),
+                                           capacity, timetables[timetable][1])
+                            for code, section, course_type, instructor, capacity, timetable in rows)
+    if len(section_patterns) != len(catalog):
+        raise ValueError("The conflict graph of the catalog cache does not match its sections")
+    catalog.section_patterns = section_patterns
+    catalog.pattern_conflicts = pattern_conflicts
+    return catalog
+
+
+def read_catalog_cache(file_path):
+    """
+        Returns the cached catalog of a course browser file, or None if there is no valid cache.
+    """
+    # the cycle collector would otherwise run over and over while the many section objects are created
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(get_cache_path(file_path), "rb") as file:
+            signature, *columns = pickle.load(file)
+        if signature != get_source_signature(file_path):
+            return None
+        return catalog_from_columns(*columns)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError, IndexError):
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def write_catalog_cache(file_path, catalog):
+    """
+        Saves the columns of a catalog (see get_catalog_columns) next to its course browser file.
+        A failed write only costs the next start its speed-up.
+    """
+    try:
+        write_atomic(get_cache_path(file_path), pickle.dumps((get_source_signature(file_path),)
+                                                             + get_catalog_columns(catalog),
+                                                             protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass
+
+
+def load_catalog(file_path, use_cache=True) -> CourseCatalog:
+    """
+        Builds the catalog of a course browser file, going through the binary cache when it is up to date.
+        The cache holds the conflict graph; the section bundles are built on first use (see get_bundles).
+    """
+    if use_cache:
+        catalog = read_catalog_cache(file_path)
+        if catalog is not None:
+            return catalog
+    # the catalog is filled as sections are parsed, the raw JSON is never held as a whole
+    catalog = CourseCatalog(iter_offered_courses(file_path))
+    if use_cache:
+        write_catalog_cache(file_path, catalog)
+    return catalog
+
+
+# catalogs loaded so far in this process, by semester
+loaded_catalogs: dict[int, CourseCatalog] = {}
+
+
+def get_catalog(semester) -> CourseCatalog:
+    """
+        Returns the section catalog of a semester (1: first, 2: second, 3: summer).
+        The course browser of a semester is only read the first time it is requested.
+    """
+    if semester not in loaded_catalogs:
+        loaded_catalogs[semester] = load_catalog(COURSE_BROWSER_FILES[semester])
+    return loaded_catalogs[semester]
+
+
+class OfferingIndex:
+    """
+        Which semesters offer each course: for every code, a bitmap with bit semester - 1 set when the catalog of
+        the semester has a section bundle of it with class times. Semesters follow each other 1, 2, 3 (summer),
+        then 1 again.
+    """
+
+    def __init__(self, offered: dict = None):
+        self.offered: dict[str, int] = offered if offered is not None else {}
+
+    def is_offered(self, code, semester=None):
+        if semester is None:
+            return self.offered.get(code, 0) != 0
+        return bool(self.offered.get(code, 0) >> (semester - 1) & 1)
+
+    def get_semesters(self, code):
+        return [semester for semester in COURSE_BROWSER_FILES if self.is_offered(code, semester)]
+
+    def get_wait(self, code, semester):
+        """
+            Returns how many semesters after the given one the course is next offered (0 when offered in it),
+            or None if no semester offers it.
+        """
+        if not self.is_offered(code):
+            return None
+        wait = 0
+        while not self.is_offered(code, semester):
+            semester = get_next_semester(semester)
+            wait += 1
+        return wait
+
+
+def get_next_semester(semester, count=1):
+    """
+        Returns the semester count semesters after the given one (1: first, 2: second, 3: summer).
+    """
+    return (semester - 1 + count) % len(COURSE_BROWSER_FILES) + 1
+
+
+def build_offering_index(codes, catalogs: dict = None) -> OfferingIndex:
+    """
+        Indexes the semesters offering each of the given codes, from the catalogs in use (see get_catalog)
+        unless catalogs (semester -> CourseCatalog) is given.
+    """
+    if catalogs is None:
+        catalogs = {semester: get_catalog(semester) for semester in COURSE_BROWSER_FILES}
+    offered = {}
+    for code in codes:
+        bits = 0
+        for semester, catalog in catalogs.items():
+            if any(bundle.hasSchedule() for bundle in catalog.get_bundles(code)):
+                bits |= 1 << (semester - 1)
+        offered[code] = bits
+    return OfferingIndex(offered)
+
+
+def load_all_catalogs():
+    """
+        Loads the catalog of every semester with its conflict graph and section bundles, e.g. before forking
+        workers that should inherit them rather than each building their own.
+    """
+    catalogs = {semester: get_catalog(semester) for semester in COURSE_BROWSER_FILES}
+    for catalog in catalogs.values():
+        catalog.build_bundles()
+    return catalogs
+
+
+def __getattr__(name):
+    # keep the old module level names (offered_list1, catalog1, CoursesSemester1, ...) working, loaded on first use
+    for semester, file_path in COURSE_BROWSER_FILES.items():
+        if name == f"offered_list{semester}":
+            return get_catalog(semester).sections
+        if name == f"catalog{semester}":
+            return get_catalog(semester)
+        if name == f"CoursesSemester{semester}":
+            return load_course_browser(file_path)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def report_load_times():
+    """
+        Prints the cold start (JSON parsing, cache rebuilt) and warm start (binary cache) load time of every semester.
+    """
+    for semester, file_path in COURSE_BROWSER_FILES.items():
+        start = timer.perf_counter()
+        catalog = load_catalog(file_path, use_cache=False)
+        write_catalog_cache(file_path, catalog)
+        cold = timer.perf_counter() - start
+        start = timer.perf_counter()
+        load_catalog(file_path)
+        warm = timer.perf_counter() - start
+        print(f"{file_path}: {len(catalog)} sections, cold start {cold * 1000:.1f} ms, warm start {warm * 1000:.1f} ms")
 
 
 # # Course schedules
@@ -118,3 +808,10 @@ for key, value in CoursesSemester3.items():
 #         # Check if the time intervals for both courses intersect
 #         if start_time1 < end_time2 and start_time2 < end_time1:
 #             print(f"Overlap found on {day} between course 1 and course 2.")
+
+
+if __name__ == "__main__":
+    # run through the importable module so the cached classes are pickled as readCourses.*
+    import readCourses
+
+    readCourses.report_load_times()
@@ -0,0 +1,218 @@
+import argparse
+import functools
+import json
+import os
+
+import main
+import readCourses
+from readCourses import COURSE_BROWSER_FILES, load_catalog
+from schedule_writer import write_atomic
+
+# Bump whenever the layout of the plan store changes
+PLAN_STORE_VERSION = 1
+
+
+class CatalogDiff:
+    """
+    The sections of a semester that changed between two versions of its course browser, by section key
+    (CODE-Type-Section). A saved schedule is affected when it uses a removed or a changed section (other
+    class times or instructor); added sections only make new plans possible, they do not break saved ones.
+    """
+
+    def __init__(self, removed=(), added=(), changed=()):
+        self.removed = set(removed)
+        self.added = set(added)
+        self.changed = set(changed)
+
+    def get_affected_keys(self):
+        return self.removed | self.changed
+
+    def is_empty(self):
+        return not (self.removed or self.added or self.changed)
+
+    def __str__(self):
+        return f"{len(self.removed)} sections removed, {len(self.added)} added, {len(self.changed)} changed"
+
+
+def diff_catalogs(old_catalog, new_catalog) -> CatalogDiff:
+    """
+    Compares two catalogs of the same semester section by section.
+    """
+    old_sections = {section.getKey(): section for section in old_catalog}
+    new_sections = {section.getKey(): section for section in new_catalog}
+    changed = [key for key in old_sections.keys() & new_sections.keys()
+               if old_sections[key].getSchedule() != new_sections[key].getSchedule()
+               or old_sections[key].getInstructor() != new_sections[key].getInstructor()]
+    return CatalogDiff(old_sections.keys() - new_sections.keys(), new_sections.keys() - old_sections.keys(), changed)
+
+
+def get_schedule_keys(schedule: dict):
+    """
+    Returns the section keys of a schedule saved with Schedule.to_dict.
+    """
+    return {f"{course['code']}-{course['type']}-{course['section']}" for course in schedule["courses"]}
+
+
+def find_first_affected(schedules: list, semester, diff: CatalogDiff):
+    """
+    Returns the index of the first saved schedule of the given semester (1, 2 or 3) that uses an affected
+    section, or None. Every schedule after it depends on the courses planned before, so it is replanned too.
+    """
+    affected_keys = diff.get_affected_keys()
+    for index, schedule in enumerate(schedules):
+        if schedule["semester"] == semester and not get_schedule_keys(schedule).isdisjoint(affected_keys):
+            return index
+    return None
+
+
+def make_store_entry(records_file, user_preferences: dict, engine, engine_options, schedules: list):
+    return {"records_file": records_file,
+            "preferences": user_preferences,
+            "engine": engine,
+            "engine_options": engine_options,
+            "schedules": [schedule.to_dict() for schedule in schedules]}
+
+
+def plan_store_entry(item, num_of_semesters: int, engine="greedy", engine_options=None):
+    records_file, user_preferences = item
+    schedules = main.plan_student(records_file, user_preferences, num_of_semesters, engine=engine,
+                                  engine_options=engine_options)
+    return make_store_entry(records_file, user_preferences, engine, engine_options, schedules)
+
+
+def build_plan_store(entries, user_preferences: dict, num_of_semesters: int, data=None, workers=1, engine="greedy",
+                     engine_options=None):
+    """
+    Plans every student of a batch (see main.read_manifest) and keeps what a later replan needs: the records
+    file, the preferences, the engine and the saved schedules.
+
+    Returns:
+        dict: The plan store, with one entry per records file.
+    """
+    items = [(records_file, user_preferences if preferences_file is None
+              else main.read_user_preferences(preferences_file)) for records_file, preferences_file in entries]
+    function = functools.partial(plan_store_entry, num_of_semesters=num_of_semesters, engine=engine,
+                                 engine_options=engine_options)
+    results = main.map_students(function, items, workers, data)
+    return {"version": PLAN_STORE_VERSION,
+            "students": {entry["records_file"]: entry for entry in results}}
+
+
+def read_plan_store(path):
+    with open(path, "r") as file:
+        store = json.load(file)
+    if store.get("version") != PLAN_STORE_VERSION:
+        raise ValueError(f"{path} is not a plan store of version {PLAN_STORE_VERSION}")
+    return store
+
+
+def write_plan_store(path, store):
+    """
+    Saves a plan store, through a temporary file so a failed write never leaves a truncated store behind.
+    """
+    write_atomic(path, json.dumps(store))
+
+
+def replan_entry(entry: dict, first_index, data=None):
+    """
+    Replans a student from the schedule at first_index on, keeping the schedules before it. The catalogs
+    in use (readCourses.loaded_catalogs) are the ones planned against.
+
+    Returns:
+        list[Schedule]: The new schedules, from first_index on.
+    """
+    if data is None:
+        data = main.planner_data if main.planner_data else main.load_planner_data()
+    schedules = entry["schedules"]
+    passed_courses = main.get_passed_courses(main.read_student_records(entry["records_file"]))
+    # the semesters kept count as passed, like create_schedules counts the semesters it plans
+    for schedule in schedules[:first_index]:
+        semesters = passed_courses.setdefault(schedule["year"], {})
+        semesters.setdefault(schedule["semester"], []).extend(course["code"] for course in schedule["courses"])
+    first = schedules[first_index]
+    return main.create_schedules(data["study_plan"], passed_courses, entry["preferences"], data["electives"],
+                                 len(schedules) - first_index, first["semester"], first["year"],
+                                 data["priority_pres"], verbose=False, engine=entry["engine"],
+                                 engine_options=entry["engine_options"],
+                                 prerequisite_graph=data["prerequisite_graph"], elective_index=data["elective_index"])
+
+
+def replan_store(store: dict, semester, diff: CatalogDiff, data=None):
+    """
+    Updates a plan store after the catalog of a semester changed: only the students with a saved schedule
+    that uses an affected section are replanned, and only from their first affected schedule on.
+    The new catalog has to be the one in use, see use_catalog.
+
+    Returns:
+        dict: records file -> index of the first replanned schedule, for every replanned student.
+    """
+    replanned = {}
+    if not diff.get_affected_keys():
+        return replanned
+    for records_file, entry in store["students"].items():
+        first_index = find_first_affected(entry["schedules"], semester, diff)
+        if first_index is None:
+            continue
+        new_schedules = replan_entry(entry, first_index, data)
+        entry["schedules"] = entry["schedules"][:first_index] + [schedule.to_dict() for schedule in new_schedules]
+        replanned[records_file] = first_index
+    return replanned
+
+
+def use_catalog(semester, catalog):
+    """
+    Makes the planner use catalog for a semester, in place of the one read from COURSE_BROWSER_FILES.
+    """
+    readCourses.loaded_catalogs[semester] = catalog
+
+
+def main_replan(argv=None):
+    parser = argparse.ArgumentParser(description="Saves batch plans and replans them when a course browser changes.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    save = subparsers.add_parser("save", help="plan a batch and save the plans to a plan store")
+    save.add_argument("store", help="the plan store file (JSON) to write")
+    save.add_argument("--batch", required=True, help="a directory of student records files, or a manifest")
+    save.add_argument("--preferences", required=True)
+    save.add_argument("--semesters", type=int, default=3)
+    save.add_argument("--engine", choices=sorted(main.SCHEDULER_ENGINES), default="greedy")
+    save.add_argument("--time-budget", type=float, default=1.0)
+    save.add_argument("--beam-width", type=int, default=0, help="plan with the lookahead beam search (see main.py)")
+    save.add_argument("--workers", type=int, default=1)
+    update = subparsers.add_parser("update", help="replan the students affected by a course browser change")
+    update.add_argument("store", help="the plan store file (JSON) to update")
+    update.add_argument("--semester", type=int, choices=sorted(COURSE_BROWSER_FILES), required=True)
+    update.add_argument("--old", required=True, help="the course browser file the plans were made with")
+    update.add_argument("--new", help="the changed course browser file (default: the semester's file)")
+    update.add_argument("--output-dir", help="also write the SuggestedCourses file of every replanned student here")
+    args = parser.parse_args(argv)
+
+    data = main.load_planner_data()
+    if args.command == "save":
+        engine_options = main.get_engine_options(args.engine, args.time_budget, args.beam_width)
+        user_preferences = main.read_user_preferences(args.preferences)
+        store = build_plan_store(main.read_manifest(args.batch), user_preferences, args.semesters, data,
+                                 args.workers, args.engine, engine_options)
+        write_plan_store(args.store, store)
+        print(f"Saved the plans of {len(store['students'])} students to {args.store}")
+    elif args.command == "update":
+        store = read_plan_store(args.store)
+        new_file = args.new if args.new is not None else COURSE_BROWSER_FILES[args.semester]
+        new_catalog = load_catalog(new_file)
+        diff = diff_catalogs(load_catalog(args.old, use_cache=False), new_catalog)
+        print(f"Semester {args.semester}: {diff}")
+        use_catalog(args.semester, new_catalog)
+        replanned = replan_store(store, args.semester, diff, data)
+        write_plan_store(args.store, store)
+        print(f"Replanned {len(replanned)} of {len(store['students'])} students")
+        if args.output_dir is not None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            names = main.get_output_names(store["students"])
+            for records_file in replanned:
+                schedules = [main.Schedule.from_dict(schedule)
+                             for schedule in store["students"][records_file]["schedules"]]
+                main.save_schedules(schedules, main.get_output_path(records_file, args.output_dir,
+                                                                    name=names[records_file]))
+
+
+if __name__ == "__main__":
+    main_replan()
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import os
+
+# days shown in the weekly schedules, in order
+SCHEDULE_DAYS = ['M', 'T', 'W', 'R', 'S']
+CSV_COLUMNS = ["year", "semester", "code", "type", "section", "instructor", "day", "time"]
+
+
+def get_week_schedule(schedule):
+    """
+    Groups the classes of a schedule by day: {day: {time: "CODE-Instructor-Section"}}.
+    """
+    week_schedule = {day: {} for day in SCHEDULE_DAYS}
+    for course in schedule.get_courses():
+        for day, time in course.getScheduling().items():
+            if day in week_schedule:
+                week_schedule[day][time] = f"{course.get_code()}-{course.get_instructor()}-{course.get_section()}"
+    return week_schedule
+
+
+def format_text(schedules):
+    """
+    Renders schedules in the SuggestedCourses.txt layout.
+    """
+    lines = []
+    for schedule in schedules:
+        lines.append(f"Weekly Schedule for Year {schedule.get_year()} - Semester {schedule.get_semester()}:")
+        lines.append("-----------------")
+        for day, classes in get_week_schedule(schedule).items():
+            lines.append(day + ":")
+            if not classes:
+                lines.append("No Classes Scheduled")
+            else:
+                for time, class_name in sorted(classes.items()):
+                    lines.append(f"  {time}: {class_name}")
+    return "".join(line + "\n" for line in lines)
+
+
+def format_json(schedules):
+    return json.dumps({"schedules": [schedule.to_dict() for schedule in schedules]}, indent=2) + "\n"
+
+
+def format_csv(schedules):
+    """
+    Renders schedules as CSV, one row per class meeting (a course held on two days has two rows).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    for schedule in schedules:
+        for course in schedule.to_dict()["courses"]:
+            for day, time in course["schedule"].items():
+                writer.writerow([schedule.get_year(), schedule.get_semester(), course["code"], course["type"],
+                                 course["section"], course["instructor"], day, time])
+    return buffer.getvalue()
+
+
+# output format -> (renderer, file extension)
+OUTPUT_FORMATS = {"text": (format_text, ".txt"), "json": (format_json, ".json"), "csv": (format_csv, ".csv")}
+
+
+def write_atomic(file_name, content):
+    """
+    Writes content (str, or bytes for a binary file) to a file in one buffered write, through a temporary file
+    in the same directory that replaces it at the end, so readers never see a partial file. The temporary file
+    is removed if the write fails.
+    """
+    temp_path = f"{file_name}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        os.replace(temp_path, file_name)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_schedules(schedules, file_name, output_format="text", atomic=True):
+    """
+    Writes the whole report of a student at once, replacing the old content of the file.
+
+    Args:
+        schedules (list[Schedule]): The planned schedules.
+        output_format (str): "text" (the SuggestedCourses.txt layout), "json" or "csv".
+        atomic (bool): Write through a temporary file that is renamed over file_name when complete.
+    """
+    render = OUTPUT_FORMATS[output_format][0]
+    content = render(schedules)
+    if atomic:
+        write_atomic(file_name, content)
+    else:
+        with open(file_name, "w") as file:
+            file.write(content)
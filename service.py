@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import http.client
+import json
+import time
+
+import main
+from readCourses import load_all_catalogs
+
+# largest request body accepted, student records and preferences are a few kilobytes
+MAX_BODY_BYTES = 1 << 20
+# latencies kept per route for the percentiles of /metrics
+LATENCY_WINDOW = 1000
+# limits of a plan request, so one request cannot hold a worker for long
+MAX_SEMESTERS = 12
+MAX_TIME_BUDGET = 10.0
+MAX_BEAM_WIDTH = 16
+ROUTES = ("/plan", "/metrics", "/health")
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class RequestError(Exception):
+    """
+    A request the service cannot serve, answered with status and a JSON {"error": message} body.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        # raised in pool workers, so it has to survive pickling
+        return RequestError, (self.status, str(self))
+
+
+def parse_grade(grade):
+    if isinstance(grade, bool) or not isinstance(grade, (int, str)):
+        raise TypeError(f"the grade {grade!r} is not an integer")
+    return int(grade)
+
+
+def parse_records(records):
+    """
+    Reads the student records of a plan request: either the text of a student records file (header line
+    included), or the dictionary read_student_records returns, with years and semesters as JSON keys.
+    Semesters must be 1, 2 or 3 (see main.SEMESTER_KEYS) and grades integers.
+    """
+    if records is None:
+        return {}
+    try:
+        if isinstance(records, str):
+            student_records = main.parse_student_records(records.strip().split("\n")[1:])
+        elif isinstance(records, dict):
+            student_records = {int(year): {int(semester): {code: parse_grade(grade) for code, grade in courses.items()}
+                                           for semester, courses in semesters.items()}
+                               for year, semesters in records.items()}
+        else:
+            raise RequestError(400, "records must be the text of a records file or an object")
+    except (ValueError, TypeError, AttributeError) as error:
+        raise RequestError(400, f"Invalid records: {error}")
+    for year, semesters in student_records.items():
+        for semester in semesters:
+            if semester not in main.SEMESTER_KEYS:
+                raise RequestError(400, f"Invalid records: semester {semester} of year {year} is not 1, 2 or 3")
+    return student_records
+
+
+def plan_request(request: dict):
+    """
+    Plans one request in a worker of the pool, with the planner data loaded in that worker.
+
+    Args:
+        request (dict): "records" (see parse_records), "preferences" (the layout of Preferences.json),
+            and optionally "semesters" (default 3, at most MAX_SEMESTERS), "engine", "time_budget" (at most
+            MAX_TIME_BUDGET seconds) and "beam_width" (at most MAX_BEAM_WIDTH), see main.create_schedules.
+
+    Returns:
+        dict: {"schedules": [...]} with every schedule as Schedule.to_dict returns it.
+    """
+    student_records = parse_records(request.get("records"))
+    if "preferences" not in request:
+        raise RequestError(400, "Missing preferences")
+    try:
+        user_preferences = main.parse_user_preferences(request["preferences"])
+    except (KeyError, TypeError, ValueError, OverflowError) as error:
+        raise RequestError(400, f"Invalid preferences: {error}")
+    engine = request.get("engine", "greedy")
+    if not isinstance(engine, str) or engine not in main.SCHEDULER_ENGINES:
+        raise RequestError(400, f"Unknown engine {engine}")
+    try:
+        num_of_semesters = int(request.get("semesters", 3))
+        time_budget = float(request.get("time_budget", 1.0))
+        beam_width = int(request.get("beam_width", 0))
+    except (TypeError, ValueError, OverflowError) as error:
+        raise RequestError(400, f"Invalid plan options: {error}")
+    # written so NaN fails every check
+    if not 1 <= num_of_semesters <= MAX_SEMESTERS:
+        raise RequestError(400, f"semesters must be between 1 and {MAX_SEMESTERS}")
+    if not 0 < time_budget <= MAX_TIME_BUDGET:
+        raise RequestError(400, f"time_budget must be more than 0 and at most {MAX_TIME_BUDGET} seconds")
+    if not 0 <= beam_width <= MAX_BEAM_WIDTH:
+        raise RequestError(400, f"beam_width must be between 0 and {MAX_BEAM_WIDTH}")
+    engine_options = main.get_engine_options(engine, time_budget, beam_width)
+    schedules = main.plan_records(student_records, user_preferences, num_of_semesters, engine=engine,
+                                  engine_options=engine_options)
+    return {"schedules": [schedule.to_dict() for schedule in schedules]}
+
+
+class LatencyMetrics:
+    """
+    Request counts and latencies per route, for the /metrics endpoint.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.routes = {}
+        self.in_flight = 0
+        self.rejected = 0
+        self.started = time.time()
+
+    def record(self, route, status, seconds):
+        metrics = self.routes.setdefault(route, {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                                                 "latencies": collections.deque(maxlen=self.window)})
+        metrics["count"] += 1
+        if status >= 400:
+            metrics["errors"] += 1
+        metrics["total_seconds"] += seconds
+        metrics["max_seconds"] = max(metrics["max_seconds"], seconds)
+        metrics["latencies"].append(seconds)
+
+    def get_report(self):
+        routes = {}
+        for route, metrics in self.routes.items():
+            latencies = sorted(metrics["latencies"])
+            routes[route] = {"count": metrics["count"],
+                             "errors": metrics["errors"],
+                             "mean_ms": metrics["total_seconds"] / metrics["count"] * 1000,
+                             "max_ms": metrics["max_seconds"] * 1000}
+            for percentile in (50, 95, 99):
+                index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+                routes[route][f"p{percentile}_ms"] = latencies[index] * 1000
+        return {"uptime_seconds": time.time() - self.started,
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+                "routes": routes}
+
+
+class PlanningService:
+    """
+    A long-running HTTP planner. The study plan, electives and catalogs are loaded once when the service
+    starts, and the worker processes are forked from it, so every request finds them in memory.
+
+    Routes:
+        POST /plan: a JSON plan request (see plan_request), answered with the schedules.
+        GET /metrics: request counts and latencies per route (see LatencyMetrics).
+        GET /health: {"status": "ok"}.
+
+    At most max_concurrent plan requests are handed to the worker pool at a time, the next max_pending wait
+    for a free slot, and any more are answered 503 right away.
+    """
+
+    def __init__(self, workers=1, max_concurrent=4, max_pending=64, study_plan_file="CEStudyPlan.txt",
+                 electives_file="Electives.txt", elective_rules_file=main.ELECTIVE_RULES_FILE):
+        self.data = main.load_planner_data(study_plan_file, electives_file, elective_rules_file)
+        load_all_catalogs()
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                               initializer=main.init_planner_worker,
+                                                               initargs=self.data["key"])
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.semaphore = None
+        self.waiting = 0
+        self.metrics = LatencyMetrics()
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self, host="127.0.0.1", port=8080):
+        host, port = await self.start(host, port)
+        print(f"Planning service listening on http://{host}:{port}", flush=True)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown()
+
+    async def plan(self, request):
+        if self.semaphore.locked() and self.waiting >= self.max_pending:
+            self.metrics.rejected += 1
+            raise RequestError(503, "Too many requests, try again later")
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, plan_request, request)
+        finally:
+            self.semaphore.release()
+
+    async def route(self, method, path, body):
+        if path == "/health":
+            return {"status": "ok"}
+        if path == "/metrics":
+            return self.metrics.get_report()
+        if path != "/plan":
+            raise RequestError(404, f"No route {path}")
+        if method != "POST":
+            raise RequestError(405, "Use POST to plan")
+        try:
+            request = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as error:
+            raise RequestError(400, f"Invalid JSON: {error}")
+        if not isinstance(request, dict):
+            raise RequestError(400, "The request must be a JSON object")
+        return await self.plan(request)
+
+    async def handle_connection(self, reader, writer):
+        start = time.perf_counter()
+        path = None
+        self.metrics.in_flight += 1
+        try:
+            try:
+                method, path, body = await read_http_request(reader)
+                status, response = 200, await self.route(method, path, body)
+            except RequestError as error:
+                status, response = error.status, {"error": str(error)}
+            except Exception as error:
+                status, response = 500, {"error": f"{type(error).__name__}: {error}"}
+            await write_http_response(writer, status, response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            status = 499
+        finally:
+            self.metrics.in_flight -= 1
+            writer.close()
+        # unknown paths, and requests rejected before their path was read, share one entry,
+        # so stray requests cannot grow the metrics
+        self.metrics.record(path if path in ROUTES else "other", status, time.perf_counter() - start)
+
+
+async def read_http_request(reader):
+    """
+    Reads one HTTP/1.1 request.
+
+    Returns:
+        A tuple (method, path, body).
+    """
+    request_line = await reader.readline()
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise RequestError(400, f"Invalid Content-Length {headers['content-length']}")
+    if length < 0:
+        raise RequestError(400, f"Invalid Content-Length {length}")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"Request bodies are limited to {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?")[0], body
+
+
+async def write_http_response(writer, status, response):
+    body = json.dumps(response).encode()
+    writer.write(f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                 f"Content-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+
+
+class ServiceClient:
+    """
+    A small client of the planning service, for scripts and local checks.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080, timeout=60):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None):
+        """
+        Returns a tuple (status, decoded JSON response).
+        """
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            body = json.dumps(payload) if payload is not None else None
+            connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def plan(self, records, preferences: dict, semesters=3, engine="greedy", beam_width=0):
+        return self.request("POST", "/plan", {"records": records, "preferences": preferences,
+                                              "semesters": semesters, "engine": engine, "beam_width": beam_width})
+
+    def plan_file(self, records_file, preferences_file, semesters=3, engine="greedy", beam_width=0):
+        with open(records_file, "r") as file:
+            records = file.read()
+        with open(preferences_file, "r") as file:
+            preferences = json.load(file)
+        return self.plan(records, preferences, semesters, engine, beam_width)
+
+    def get_metrics(self):
+        return self.request("GET", "/metrics")[1]
+
+
+def main_service(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP planning service of the study schedule planner.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="run the service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--workers", type=int, default=1, help="planner processes (default: 1)")
+    serve.add_argument("--max-concurrent", type=int, default=4,
+                       help="plan requests handed to the workers at a time (default: 4)")
+    serve.add_argument("--max-pending", type=int, default=64,
+                       help="plan requests waiting for a slot before new ones get 503 (default: 64)")
+    serve.add_argument("--study-plan", default="CEStudyPlan.txt")
+    serve.add_argument("--electives", default="Electives.txt")
+    serve.add_argument("--elective-rules", default=main.ELECTIVE_RULES_FILE)
+    plan = subparsers.add_parser("plan", help="send a student records file to a running service")
+    plan.add_argument("records")
+    plan.add_argument("--preferences", default="Preferences.json")
+    plan.add_argument("--semesters", type=int, default=3)
+    plan.add_argument("--engine", choices=sorted(main.SCHEDULER_ENGINES), default="greedy")
+    plan.add_argument("--beam-width", type=int, default=0)
+    plan.add_argument("--host", default="127.0.0.1")
+    plan.add_argument("--port", type=int, default=8080)
+    metrics = subparsers.add_parser("metrics", help="print the metrics of a running service")
+    metrics.add_argument("--host", default="127.0.0.1")
+    metrics.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        service = PlanningService(args.workers, args.max_concurrent, args.max_pending, args.study_plan,
+                                  args.electives, args.elective_rules)
+        try:
+            asyncio.run(service.serve_forever(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.executor.shutdown()
+    elif args.command == "plan":
+        status, response = ServiceClient(args.host, args.port).plan_file(args.records, args.preferences,
+                                                                         args.semesters, args.engine,
+                                                                         args.beam_width)
+        print(json.dumps(response, indent=2))
+        if status != 200:
+            raise SystemExit(1)
+    elif args.command == "metrics":
+        print(json.dumps(ServiceClient(args.host, args.port).get_metrics(), indent=2))
+
+
+if __name__ == "__main__":
+    main_service()